@@ -1,9 +1,15 @@
+import json
+import time
 import tkinter as tk
 from window import MainWindow
 
 
 class MainApp:
-    def __init__(self):
+    def __init__(self, started=None, startup_probe=False):
+        self.started = time.perf_counter() if started is None else started
+        self.startup_probe = startup_probe
+        self.startup_times = {}
+
         self.root = tk.Tk()
         self.root.configure(bg='white')
         self.root.title("Biometrics_project_01")
@@ -14,6 +20,23 @@ class MainApp:
         self.root.bind("<Configure>", self.size_changer)
 
         self.window = MainWindow(self.root)
+        self.root.after_idle(self.on_interactive)
+
+    def on_interactive(self):
+        # The first idle callback runs once the welcome screen has been drawn
+        # and the event loop is responding.
+        self.startup_times["interactive_s"] = time.perf_counter() - self.started
+        self.window.start_background_loading(self.on_engines_ready)
+
+    def on_engines_ready(self, elapsed):
+        self.startup_times["engines_ready_s"] = time.perf_counter() - self.started
+        self.startup_times["background_load_s"] = elapsed
+        self.window.status_bar.configure(
+            text=f"Ready in {self.startup_times['interactive_s'] * 1000:.0f} ms, "
+                 f"processing engines loaded in {self.startup_times['engines_ready_s'] * 1000:.0f} ms")
+        if self.startup_probe:
+            print(json.dumps(self.startup_times), flush=True)
+            self.root.destroy()
 
     def size_changer(self, event):
         our_state = self.root.state()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image
+from image_processing import ImageProcessor
+from graphics_filter import (apply_gaussian_filter, apply_sharpening_filter, apply_averaging_filter,
+                             apply_median_filter, apply_bilateral_filter)
+from edge_detection import (roberts_cross_own_working_way, sobel_operator_own_working_way,
+                            scharr_operator_own_working_way, laplace_operator_own_working_way, canny_edge_detector)
+from projection import project_image
+from thresholding import auto_binarize, adaptive_binarize
+from morphology import erode, skeletonize
+from equalization import equalize_histogram, clahe
+from pyramid import gaussian_pyramid, pyramid_edges, scale_space_edges
+
+SIZES = {
+    "256": (256, 256),
+    "512": (512, 512),
+    "1024": (1024, 1024),
+    "2048": (2048, 2048),
+    "4096": (4096, 4096),
+    "8k": (7680, 4320),
+}
+
+KERNEL_SIZES = (3, 5, 9, 15)
+
+# A sparse diagonal detector, and the same taps scaled to non-integers, which
+# forces the float32 path; the pair shows what integer accumulation gains.
+SPARSE_WEIGHTS = [[0, 0, 2], [0, 0, 0], [-2, 0, 0]]
+SPARSE_FLOAT_WEIGHTS = [[0, 0, 1.5], [0, 0, 0], [-1.5, 0, 0]]
+
+
+def _operations(kernel_sizes):
+    operations = [
+        ("grayscale", ImageProcessor.to_grayscale, ()),
+        ("negative", ImageProcessor.to_negative, ()),
+        ("brightness", ImageProcessor.adjust_brightness, (1.2,)),
+        ("contrast", ImageProcessor.adjust_contrast, (1.5,)),
+        ("binarize", ImageProcessor.binarize, (128,)),
+        ("equalize", equalize_histogram, ()),
+        ("clahe[8x8]", clahe, (8, 2.0)),
+        ("auto_binarize[otsu]", auto_binarize, ("otsu",)),
+        ("adaptive_binarize[sauvola,25]", adaptive_binarize, ("sauvola", 25)),
+        ("adaptive_binarize[sauvola,101]", adaptive_binarize, ("sauvola", 101)),
+        ("skeletonize", skeletonize, ()),
+    ]
+    for sigma in (2.0, 20.0):
+        operations.append((f"gaussian[recursive,sigma={sigma:g}]", apply_gaussian_filter, (None, sigma, "recursive")))
+    for sigma in (4.0, 16.0):
+        operations.append((f"bilateral[sigma={sigma:g}]", apply_bilateral_filter, (sigma, 0.1)))
+    for k in kernel_sizes:
+        operations.append((f"gaussian[k={k}]", apply_gaussian_filter, (k, k / 3.0)))
+        operations.append((f"sharpening[k={k}]", apply_sharpening_filter, (k, 1.0)))
+        operations.append((f"averaging[k={k}]", apply_averaging_filter, (k,)))
+        operations.append((f"median[k={k}]", apply_median_filter, (k,)))
+        operations.append((f"erode[k={k}]", erode, (k,)))
+    operations += [
+        ("roberts", roberts_cross_own_working_way, (None,)),
+        ("sobel", sobel_operator_own_working_way, (None,)),
+        ("scharr", scharr_operator_own_working_way, (None,)),
+        ("laplace", laplace_operator_own_working_way, (None,)),
+        ("custom[sparse,int]", sobel_operator_own_working_way, (SPARSE_WEIGHTS,)),
+        ("custom[sparse,float]", sobel_operator_own_working_way, (SPARSE_FLOAT_WEIGHTS,)),
+        ("canny", canny_edge_detector, ()),
+        ("gaussian_pyramid[5]", gaussian_pyramid, (5,)),
+        ("pyramid_edges[sobel,level=2]", pyramid_edges, ("sobel", 2)),
+        ("scale_space_edges[sobel,3]", scale_space_edges, ("sobel", 3)),
+        ("projection", project_image, ("Horizontal", 1.0, True)),
+    ]
+    return operations
+
+
+def synthetic_image(width, height, mode="RGB", seed=0):
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus noise, so filters and thresholds see realistic
+    # structure rather than pure white noise.
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 127.5 + 60 * np.sin(x / 37.0) * np.cos(y / 23.0)
+    channels = 3 if mode == "RGB" else 1
+    noise = rng.normal(0, 25, (height, width, channels)).astype(np.float32)
+    pixels = np.clip(base[..., None] + noise, 0, 255).astype(np.uint8)
+    if mode == "L":
+        return Image.fromarray(pixels[..., 0])
+    if mode == "I;16":
+        return Image.fromarray(pixels[..., 0].astype(np.uint16) * 257)
+    return Image.fromarray(pixels)
+
+
+def measure(func, image, args, repeats, warmup=1):
+    for _ in range(warmup):
+        func(image, *args)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(image, *args)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(image, *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_benchmarks(sizes, kernel_sizes, repeats, mode="RGB", only=None, progress=None):
+    results = []
+    for size_name in sizes:
+        width, height = SIZES[size_name]
+        image = synthetic_image(width, height, mode)
+        megapixels = width * height / 1e6
+        for name, func, args in _operations(kernel_sizes):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            timings, peak = measure(func, image, args, repeats)
+            median = statistics.median(timings)
+            result = {
+                "id": f"{name}@{size_name}/{mode}",
+                "operation": name,
+                "size": [width, height],
+                "mode": mode,
+                "repeats": repeats,
+                "median_s": median,
+                "p95_s": percentile(timings, 0.95),
+                "throughput_mp_s": megapixels / median if median > 0 else None,
+                "peak_memory_bytes": peak,
+            }
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    previous = {entry["id"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["id"])
+        if before is None:
+            continue
+        ratio = result["median_s"] / before["median_s"] if before["median_s"] > 0 else 1.0
+        result["baseline_median_s"] = before["median_s"]
+        result["ratio"] = ratio
+        if ratio > 1.0 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def _print_result(result):
+    print(f"{result['id']:<32} median {result['median_s'] * 1000:10.2f} ms   "
+          f"p95 {result['p95_s'] * 1000:10.2f} ms   "
+          f"{result['throughput_mp_s']:8.2f} MP/s   "
+          f"peak {result['peak_memory_bytes'] / 2 ** 20:8.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every image operation across image sizes.")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma separated subset of {', '.join(SIZES)}")
+    parser.add_argument("--kernels", default=",".join(str(k) for k in KERNEL_SIZES),
+                        help="comma separated kernel sizes for the graphics filters")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--mode", default="RGB", choices=("RGB", "L", "I;16"))
+    parser.add_argument("--only", help="comma separated substrings of operation names to run")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown of the median against the baseline (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    kernel_sizes = [int(k) for k in args.kernels.split(",") if k.strip()]
+    only = [name.strip() for name in args.only.split(",")] if args.only else None
+
+    results = run_benchmarks(sizes, kernel_sizes, args.repeats, args.mode, only, progress=_print_result)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for result in regressions:
+            print(f"REGRESSION {result['id']}: {result['median_s'] * 1000:.2f} ms vs "
+                  f"{result['baseline_median_s'] * 1000:.2f} ms (x{result['ratio']:.2f})")
+        if not regressions:
+            print("No regressions against baseline.")
+
+    if args.output:
+        report = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import numpy as np
+from PIL import Image
+
+EIGHT_BIT_MODES = ("L", "RGB")
+SIXTEEN_BIT_MODES = ("I;16", "I;16L", "I;16B", "I;16N", "I")
+
+
+def working_mode(img: Image.Image) -> str:
+    if img.mode in EIGHT_BIT_MODES or img.mode == "F":
+        return img.mode
+    if img.mode in SIXTEEN_BIT_MODES:
+        return "I;16"
+    return "RGB"
+
+
+def max_value(mode: str):
+    if mode == "F":
+        return 1.0
+    if mode in SIXTEEN_BIT_MODES:
+        return 65535
+    return 255
+
+
+def is_high_bit_depth(img: Image.Image) -> bool:
+    return working_mode(img) not in EIGHT_BIT_MODES
+
+
+def to_array(img: Image.Image) -> np.ndarray:
+    mode = working_mode(img)
+    if mode == "I;16":
+        if img.mode in ("I;16", "I;16L", "I;16N"):
+            return np.asarray(img, dtype=np.uint16)
+        return np.clip(np.asarray(img.convert("I"), dtype=np.int64), 0, 65535).astype(np.uint16)
+    if mode != img.mode:
+        img = img.convert(mode)
+    return np.asarray(img)
+
+
+def from_array(arr: np.ndarray, mode: str) -> Image.Image:
+    if mode == "F":
+        return Image.fromarray(np.ascontiguousarray(arr, dtype=np.float32))
+    if arr.dtype.kind == "f":
+        arr = np.clip(np.trunc(arr), 0, max_value(mode))
+    dtype = np.uint16 if mode == "I;16" else np.uint8
+    return Image.fromarray(np.ascontiguousarray(arr, dtype=dtype))
+
+
+def gray_mode(img: Image.Image) -> str:
+    mode = working_mode(img)
+    return "L" if mode in EIGHT_BIT_MODES else mode
+
+
+def gray_array(img: Image.Image) -> np.ndarray:
+    mode = working_mode(img)
+    if mode == "RGB":
+        return np.asarray(img.convert("L"))
+    return to_array(img)
+
+
+def gray_histogram(img: Image.Image, bins=256):
+    gray = gray_array(img)
+    limit = max_value(working_mode(img))
+    upper = limit if working_mode(img) == "F" else limit + 1
+    if bins == upper and gray.dtype.kind == "u":
+        counts = np.bincount(gray.ravel(), minlength=upper)
+    else:
+        counts, _ = np.histogram(gray, bins=bins, range=(0, upper))
+    return counts, upper
+
+
+def to_display_image(img: Image.Image) -> Image.Image:
+    if not is_high_bit_depth(img):
+        return img
+    arr = to_array(img).astype(np.float32)
+    arr *= 255.0 / max_value(working_mode(img))
+    return Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
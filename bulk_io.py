@@ -0,0 +1,123 @@
+import argparse
+import functools
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from bit_depth import to_display_image
+from frame_stream import PoolStage, MapStage, run_stages
+from pipeline import Pipeline, parse_step
+from shared_batch import SharedBatchExecutor, list_images
+
+OUTPUT_EXTENSIONS = {"png": "PNG", "tiff": "TIFF", "bmp": "BMP", "jpg": "JPEG"}
+
+
+def _decode(path):
+    image = Image.open(path)
+    image.load()
+    return path, image
+
+
+def _compute(executor, items):
+    # Only the images go to the shared-memory workers; their paths wait here.
+    paths = deque()
+
+    def images():
+        for path, image in items:
+            paths.append(path)
+            yield image
+
+    for image, seconds in executor.map(images(), timed=True):
+        yield (paths.popleft(), image), seconds
+
+
+def _encode(output_dir, extension, item):
+    path, image = item
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(output_dir, f"{name}.{extension}")
+    if extension == "jpg":
+        # JPEG has no 16-bit or float variant; scale those down to 8 bits.
+        image = to_display_image(image)
+    image.save(target, format=OUTPUT_EXTENSIONS[extension])
+    return target
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    # Pillow releases the GIL while decoding and encoding, so those pools can be
+    # larger than the core count; compute processes get one core each.
+    return {"decode": min(8, cores * 2), "compute": cores, "encode": min(8, cores * 2)}
+
+
+def process_folder(paths, output_dir, spec, extension="png", workers=None, queue_size=8, progress=None,
+                   slot_bytes=64 * 2 ** 20):
+    Pipeline.from_spec(None, spec)
+    workers = {**default_workers(), **(workers or {})}
+    os.makedirs(output_dir, exist_ok=True)
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(workers["decode"], "decode") as decoders, \
+            SharedBatchExecutor(spec, workers["compute"], slot_bytes, high_precision=False) as computers, \
+            ThreadPoolExecutor(workers["encode"], "encode") as encoders:
+        # Each stage keeps twice its worker count in flight, so no worker waits
+        # for the next item while the bounded queues still cap memory use. The
+        # compute workers get their images through shared memory, not pickles.
+        read = PoolStage("decode", _decode, iter(paths), stop, decoders, 2 * workers["decode"], queue_size)
+        compute = MapStage("compute", functools.partial(_compute, computers), read.output, stop, queue_size)
+        write = PoolStage("encode", functools.partial(_encode, output_dir, extension), compute.output, stop,
+                          encoders, 2 * workers["encode"], queue_size)
+        stages = [read, compute, write]
+        count, elapsed = run_stages(stages, progress)
+
+    return {
+        "images": count,
+        "elapsed_s": elapsed,
+        "images_per_s": count / elapsed if elapsed > 0 else None,
+        # What each stage could sustain on its own with all of its workers busy;
+        # the end-to-end rate is bounded by the smallest of these.
+        "stages": {stage.name: {"workers": workers[stage.name],
+                                "ms_per_image": stage.busy_s / stage.items * 1000 if stage.items else None,
+                                "capacity_per_s": workers[stage.name] * stage.items / stage.busy_s
+                                if stage.busy_s else None}
+                   for stage in stages},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Process a folder of images with overlapped decoding, computation and encoding.")
+    parser.add_argument("input", help="directory of images")
+    parser.add_argument("output", help="directory for the results")
+    parser.add_argument("steps", nargs="*", help="operation steps, e.g. grayscale gaussian:kernel_size=5,sigma=1.5 sobel")
+    parser.add_argument("--spec", help="JSON file with a list of {\"op\": name, ...params} steps")
+    parser.add_argument("--format", default="png", choices=sorted(OUTPUT_EXTENSIONS))
+    parser.add_argument("--decode-workers", type=int)
+    parser.add_argument("--compute-workers", type=int)
+    parser.add_argument("--encode-workers", type=int)
+    parser.add_argument("--queue-size", type=int, default=8, help="images buffered between stages")
+    parser.add_argument("--slot-mb", type=float, default=64, help="largest decoded image, in MiB")
+    args = parser.parse_args(argv)
+
+    spec = [parse_step(step) for step in args.steps]
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f) + spec
+    workers = {name: count for name, count in (("decode", args.decode_workers), ("compute", args.compute_workers),
+                                               ("encode", args.encode_workers)) if count}
+
+    stats = process_folder(list_images(args.input), args.output, spec, args.format, workers, args.queue_size,
+                           progress=lambda count, rate: print(f"{count} images, {rate:.1f} images/s"),
+                           slot_bytes=int(args.slot_mb * 2 ** 20))
+
+    print(f"Processed {stats['images']} images in {stats['elapsed_s']:.2f} s "
+          f"({stats['images_per_s'] or 0:.1f} images/s)")
+    for name, stage in stats["stages"].items():
+        if stage["ms_per_image"] is not None:
+            print(f"  {name:<8} {stage['workers']:>3} workers {stage['ms_per_image']:8.1f} ms/image "
+                  f"-> up to {stage['capacity_per_s']:.1f} images/s")
+
+
+if __name__ == '__main__':
+    main()
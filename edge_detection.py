@@ -1,128 +1,108 @@
-import math
+import numpy as np
+from bit_depth import gray_mode, gray_array, max_value, from_array
 from PIL import Image
+from fast_kernels import (gradient_magnitude, laplace_magnitude, roberts_magnitude, symmetric_blur,
+                          gradient_components, suppress_non_maxima, connected_strong)
+from graphics_filter import kernel_of_the_gauss, gaussian_kernel_size
+
+ROBERTS_WEIGHTS = [[1, 0], [0, -1]]
+
+SOBEL_WEIGHTS = [[-1, 0, 1],
+                 [-2, 0, 2],
+                 [-1, 0, 1]]
+
+SCHARR_WEIGHTS = [[-3, 0, 3],
+                  [-10, 0, 10],
+                  [-3, 0, 3]]
+
+LAPLACE_WEIGHTS = [[0, -1, 0],
+                   [-1, 4, -1],
+                   [0, -1, 0]]
+
+
+CANNY_OPERATORS = {"sobel": SOBEL_WEIGHTS, "scharr": SCHARR_WEIGHTS}
+CANNY_STRIP_ROWS = 64
+
+
+def _edge_result(img, magnitude, *matrices):
+    mode = gray_mode(img)
+    # 8- and 16-bit pixels stay integers so that integral kernels can take the
+    # integer path in fast_kernels.
+    result = magnitude(gray_array(img), *matrices)
+    np.clip(result, 0, max_value(mode), out=result)
+    return from_array(result, mode)
+
 
 def roberts_cross_own_working_way(img, weight_matrix=None):
 
     if weight_matrix is None:
-        weight_matrix = [[1, 0], [0, -1]]
+        weight_matrix = ROBERTS_WEIGHTS
     if len(weight_matrix) != 2 or any(len(row) != 2 for row in weight_matrix):
         raise ValueError("Weights matrix must be 2x2.")
-    gray = img.convert("L")
-    width, height = gray.size
-    new_img = Image.new("L", (width, height))
-    src = gray.load()
-    dst = new_img.load()
-
-    second_matrix = [
-        [weight_matrix[0][1], -weight_matrix[0][0]],
-        [-weight_matrix[1][1], weight_matrix[1][0]]
-    ]
-
-    for y in range(height - 1):
-        for x in range(width - 1):
-            gx = (weight_matrix[0][0] * src[x, y] +
-                  weight_matrix[0][1] * src[x + 1, y] +
-                  weight_matrix[1][0] * src[x, y + 1] +
-                  weight_matrix[1][1] * src[x + 1, y + 1])
-            gy = (second_matrix[0][0] * src[x, y] +
-                  second_matrix[0][1] * src[x + 1, y] +
-                  second_matrix[1][0] * src[x, y + 1] +
-                  second_matrix[1][1] * src[x + 1, y + 1])
-            magnitude = math.sqrt(gx * gx + gy * gy)
-            dst[x, y] = min(255, int(magnitude))
-
-    for y in range(height):
-        dst[width - 1, y] = 0
-    for x in range(width):
-        dst[x, height - 1] = 0
-
-    return new_img.convert("RGB")
+    return _edge_result(img, roberts_magnitude, weight_matrix)
 
 
 def sobel_operator_own_working_way(img, weight_matrix=None):
     if weight_matrix is None:
-        weight_matrix = [[-1, 0, 1],
-                         [-2, 0, 2],
-                         [-1, 0, 1]]
+        weight_matrix = SOBEL_WEIGHTS
     if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
         raise ValueError("Weight matrix must be 3x3")
     second_matrix = [list(row) for row in zip(*weight_matrix[::-1])]
-    gray = img.convert("L")
-    width, height = gray.size
-    new_img = Image.new("L", (width, height))
-    src = gray.load()
-    dst = new_img.load()
-
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            gx = 0.0
-            gy = 0.0
-            for j in range(-1, 2):
-                for i in range(-1, 2):
-                    pixel = src[x + i, y + j]
-                    gx += pixel * weight_matrix[j + 1][i + 1]
-                    gy += pixel * second_matrix[j + 1][i + 1]
-            g = int(math.sqrt(gx * gx + gy * gy))
-            if g > 255:
-                g = 255
-            dst[x, y] = g
-
-    return new_img.convert("RGB")
+    return _edge_result(img, gradient_magnitude, weight_matrix, second_matrix)
 
 
 def laplace_operator_own_working_way(img, weight_matrix=None):
     if weight_matrix is None:
-        weight_matrix = [[0, -1, 0],
-                         [-1, 4, -1],
-                         [0, -1, 0]]
+        weight_matrix = LAPLACE_WEIGHTS
     if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
         raise ValueError("Weights matrix must be 3x3.")
-    gray = img.convert("L")
-    w, h = gray.size
-    new_img = Image.new("L", (w, h))
-    src = gray.load()
-    dst = new_img.load()
-
-    for y in range(1, h - 1):
-        for x in range(1, w - 1):
-            acc = 0.0
-            for j in range(-1, 2):
-                for i in range(-1, 2):
-                    acc += src[x + i, y + j] * weight_matrix[j + 1][i + 1]
-            acc = abs(acc)
-            if acc > 255:
-                acc = 255
-            dst[x, y] = int(acc)
-
-    return new_img.convert("RGB")
+    return _edge_result(img, laplace_magnitude, weight_matrix)
 
 
 def scharr_operator_own_working_way(img, weight_matrix=None):
     if weight_matrix is None:
-        weight_matrix = [[-3, 0, 3],
-                         [-10, 0, 10],
-                         [-3, 0, 3]]
+        weight_matrix = SCHARR_WEIGHTS
     if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
         raise ValueError("Weight matrix must be 3x3")
     second_matrix = [list(row) for row in zip(*weight_matrix[::-1])]
-    gray = img.convert("L")
-    width, height = gray.size
-    new_img = Image.new("L", (width, height))
-    src = gray.load()
-    dst = new_img.load()
-
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            gx = 0.0
-            gy = 0.0
-            for j in range(-1, 2):
-                for i in range(-1, 2):
-                    p = src[x + i, y + j]
-                    gx += p * weight_matrix[j + 1][i + 1]
-                    gy += p * second_matrix[j + 1][i + 1]
-            g = int(math.sqrt(gx * gx + gy * gy))
-            if g > 255:
-                g = 255
-            dst[x, y] = g
-
-    return new_img.convert("RGB")
+    return _edge_result(img, gradient_magnitude, weight_matrix, second_matrix)
+
+
+def canny_edge_detector(img, sigma=1.4, low=0.1, high=0.2, operator="sobel"):
+    # Thresholds are fractions of the strongest gradient, so they work the same
+    # for 8-bit, 16-bit and float images.
+    if operator not in CANNY_OPERATORS:
+        raise ValueError(f"Unknown gradient operator '{operator}', expected one of: {', '.join(CANNY_OPERATORS)}")
+    if not 0 <= low <= high <= 1:
+        raise ValueError("Thresholds must satisfy 0 <= low <= high <= 1")
+    gray = gray_array(img)
+    h, w = gray.shape
+    taps = None
+    if sigma > 0:
+        # The Gaussian is separable; its row sums are the 1D taps.
+        taps = np.sum(kernel_of_the_gauss(gaussian_kernel_size(sigma), sigma), axis=1)
+    weight_matrix = CANNY_OPERATORS[operator]
+    # Blur, gradients and suppression run on strips of rows that stay in cache.
+    # Each strip carries enough rows above and below for all three stages.
+    halo = (len(taps) // 2 if taps is not None else 0) + 2
+    magnitude = np.empty((h, w), dtype=np.float32)
+    thin = np.empty((h, w), dtype=bool)
+    for first in range(0, h, CANNY_STRIP_ROWS):
+        last = min(first + CANNY_STRIP_ROWS, h)
+        top, bottom = max(first - halo, 0), min(last + halo, h)
+        strip = gray[top:bottom].astype(np.float32)
+        if taps is not None:
+            strip = symmetric_blur(strip, taps)
+        gx, gy = gradient_components(strip, weight_matrix[0][2], weight_matrix[1][2])
+        # Squared magnitudes order the same way, so the square root is never taken.
+        strip = gx * gx
+        strip += gy * gy
+        rows = slice(first - top, last - top)
+        magnitude[first:last] = strip[rows]
+        thin[first:last] = suppress_non_maxima(strip, gx, gy, rows)
+    peak = float(magnitude.max())
+    if peak == 0:
+        return Image.fromarray(np.zeros((h, w), dtype=np.uint8))
+    thin &= magnitude >= np.float32(max(low * low * peak, np.finfo(np.float32).tiny))
+    strong = thin & (magnitude >= np.float32(high * high * peak))
+    return Image.fromarray(connected_strong(thin, strong).view(np.uint8) * np.uint8(255))
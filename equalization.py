@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from bit_depth import working_mode, max_value, to_array, from_array
+
+
+def _default_bins(mode):
+    return 256 if mode in ("L", "RGB") else 4096
+
+
+def _bin_indices(pixels, mode, bins):
+    if mode == "F":
+        return np.clip(pixels * bins, 0, bins - 1).astype(np.intp)
+    if bins == max_value(mode) + 1:
+        return pixels.astype(np.intp)
+    return (pixels.astype(np.int64) * bins // (max_value(mode) + 1)).astype(np.intp)
+
+
+def _luminance(img):
+    # Colour images are enhanced on Y only so that hues do not shift.
+    if working_mode(img) != "RGB":
+        return img, None
+    y, cb, cr = img.convert("RGB").convert("YCbCr").split()
+    return y, (cb, cr)
+
+
+def _recombine(result, chroma):
+    if chroma is None:
+        return result
+    return Image.merge("YCbCr", (result,) + chroma).convert("RGB")
+
+
+def equalize_histogram(img: Image.Image, bins=None) -> Image.Image:
+    gray, chroma = _luminance(img)
+    mode = working_mode(gray)
+    bins = bins or _default_bins(mode)
+    pixels = to_array(gray)
+    index = _bin_indices(pixels, mode, bins)
+    cdf = np.cumsum(np.bincount(index.ravel(), minlength=bins))
+    first = cdf[np.flatnonzero(cdf)[0]]
+    if cdf[-1] == first:
+        return _recombine(from_array(pixels.copy(), mode), chroma)
+    lut = (cdf - first) / (cdf[-1] - first) * max_value(mode)
+    if mode != "F":
+        lut = np.round(lut)
+    return _recombine(from_array(lut[index], mode), chroma)
+
+
+def _tile_grid(tiles):
+    return (tiles, tiles) if isinstance(tiles, int) else tuple(tiles)
+
+
+def _strips(tile_rows, workers):
+    # Consecutive tile rows per worker; each strip is independent in both passes.
+    count = min(workers, tile_rows)
+    bounds = np.linspace(0, tile_rows, count + 1).astype(int)
+    return [(bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+def _interpolation(length, tile, count):
+    # Position of every pixel between the centres of its two nearest tiles.
+    centre = (np.arange(length) + 0.5) / tile - 0.5
+    low = np.clip(np.floor(centre).astype(int), 0, count - 1)
+    high = np.minimum(low + 1, count - 1)
+    weight = np.clip(centre - low, 0, 1).astype(np.float32)
+    return low, high, weight
+
+
+def clahe(img: Image.Image, tiles=8, clip_limit=2.0, bins=None, workers=None) -> Image.Image:
+    if clip_limit < 1:
+        raise ValueError("clip_limit must be at least 1 (1 disables the contrast gain)")
+    gray, chroma = _luminance(img)
+    mode = working_mode(gray)
+    bins = bins or _default_bins(mode)
+    tiles_y, tiles_x = _tile_grid(tiles)
+    pixels = to_array(gray)
+    h, w = pixels.shape
+    tiles_y, tiles_x = min(tiles_y, h), min(tiles_x, w)
+    tile_h, tile_w = -(-h // tiles_y), -(-w // tiles_x)
+    tiles_y, tiles_x = -(-h // tile_h), -(-w // tile_w)
+    index = _bin_indices(pixels, mode, bins)
+    column_tile = np.arange(w) // tile_w
+    strips = _strips(tiles_y, workers or min(4, os.cpu_count() or 1))
+    luts = np.empty((tiles_y, tiles_x, bins), dtype=np.float32)
+
+    def build_luts(strip):
+        first, last = strip
+        rows = index[first * tile_h:last * tile_h]
+        # One bincount over (tile, bin) pairs gives every tile's histogram.
+        keys = ((np.arange(rows.shape[0]) // tile_h)[:, None] * tiles_x + column_tile) * bins + rows
+        counts = np.bincount(keys.ravel(), minlength=(last - first) * tiles_x * bins)
+        counts = counts.reshape(last - first, tiles_x, bins).astype(np.float32)
+        area = counts.sum(axis=2, keepdims=True)
+        limit = np.maximum(clip_limit * area / bins, 1)
+        excess = np.maximum(counts - limit, 0).sum(axis=2, keepdims=True)
+        clipped = np.minimum(counts, limit) + excess / bins
+        luts[first:last] = np.cumsum(clipped, axis=2) * (max_value(mode) / area)
+
+    y_low, y_high, y_weight = _interpolation(h, tile_h, tiles_y)
+    x_low, x_high, x_weight = _interpolation(w, tile_w, tiles_x)
+    result = np.empty((h, w), dtype=np.float32)
+
+    def apply_luts(strip):
+        rows = slice(strip[0] * tile_h, min(strip[1] * tile_h, h))
+        b = index[rows]
+        table = luts.reshape(-1)
+        top, bottom = y_low[rows, None] * tiles_x, y_high[rows, None] * tiles_x
+        upper = table[(top + x_low) * bins + b] * (1 - x_weight)
+        upper += table[(top + x_high) * bins + b] * x_weight
+        lower = table[(bottom + x_low) * bins + b] * (1 - x_weight)
+        lower += table[(bottom + x_high) * bins + b] * x_weight
+        weight = y_weight[rows, None]
+        result[rows] = upper * (1 - weight) + lower * weight
+
+    # Strips of tile rows share the arrays, so threads need no copies, and the
+    # element-wise arithmetic on them runs outside the GIL.
+    with ThreadPoolExecutor(len(strips)) as executor:
+        list(executor.map(build_luts, strips))
+        list(executor.map(apply_luts, strips))
+    if mode != "F":
+        np.round(result, out=result)
+    return _recombine(from_array(result, mode), chroma)
@@ -0,0 +1,606 @@
+import numpy as np
+
+
+def scratch_buffer(scratch, name, shape, dtype=np.float32):
+    if scratch is None:
+        return np.empty(shape, dtype=dtype)
+    buffer = scratch.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = np.empty(shape, dtype=dtype)
+        scratch[name] = buffer
+    return buffer
+
+
+def pad_edge(src, top, bottom, left, right, out=None):
+    h, w = src.shape[:2]
+    shape = (h + top + bottom, w + left + right) + src.shape[2:]
+    if out is None or out.shape != shape:
+        out = np.empty(shape, dtype=src.dtype)
+
+    out[top:top + h, left:left + w] = src
+    out[:top, left:left + w] = src[:1]
+    out[top + h:, left:left + w] = src[-1:]
+    out[:, :left] = out[:, left:left + 1]
+    out[:, left + w:] = out[:, left + w - 1:left + w]
+    return out
+
+
+def _separate(kernel):
+    # Gaussian and box kernels are outer products of two 1D kernels, so they can
+    # be applied as two passes of k taps instead of one pass of k * k taps.
+    u, s, vt = np.linalg.svd(kernel.astype(np.float64))
+    if s[0] == 0 or np.any(s[1:] > s[0] * 1e-7):
+        return None
+    scale = np.sqrt(s[0])
+    return (u[:, 0] * scale).astype(np.float32), (vt[0] * scale).astype(np.float32)
+
+
+def correlate(src, kernel, out=None, scratch=None):
+    kernel = np.asarray(kernel, dtype=np.float32)
+    kh, kw = kernel.shape
+    h, w = src.shape[:2]
+    if out is None:
+        out = np.empty(src.shape, dtype=np.float32)
+
+    parts = _separate(kernel) if kh > 1 and kw > 1 else None
+    if parts is not None:
+        column, row = parts
+        tmp = scratch_buffer(scratch, "separable", src.shape)
+        _correlate_taps(src, column.reshape(-1, 1), tmp, scratch)
+        return _correlate_taps(tmp, row.reshape(1, -1), out, scratch)
+    return _correlate_taps(src, kernel, out, scratch)
+
+
+def _correlate_taps(src, kernel, out, scratch):
+    kh, kw = kernel.shape
+    h, w = src.shape[:2]
+    top, left = kh // 2, kw // 2
+    padded_shape = (h + kh - 1, w + kw - 1) + src.shape[2:]
+    padded = pad_edge(src, top, kh - 1 - top, left, kw - 1 - left,
+                      out=scratch_buffer(scratch, f"padded{kh}x{kw}", padded_shape, src.dtype))
+    tmp = scratch_buffer(scratch, "product", src.shape)
+
+    out.fill(0)
+    for j in range(kh):
+        for i in range(kw):
+            np.multiply(padded[j:j + h, i:i + w], kernel[j, i], out=tmp)
+            np.add(out, tmp, out=out)
+    return out
+
+
+def rgb_to_gray(src, out=None):
+    if src.ndim == 2:
+        if out is None:
+            return src.astype(np.float32)
+        out[...] = src
+        return out
+    if out is None:
+        out = np.empty(src.shape[:2], dtype=np.float32)
+    np.multiply(src[..., 0], 0.299, out=out)
+    out += 0.587 * src[..., 1]
+    out += 0.114 * src[..., 2]
+    return out
+
+
+def _accumulate(acc, window, weight, tmp):
+    if weight:
+        np.multiply(window, np.float32(weight), out=tmp)
+        acc += tmp
+
+
+def integer_accumulator(gray, *matrices):
+    # Integral weights on integer pixels sum exactly in int16, or in int32 when
+    # the largest possible sum does not fit; None selects the float32 path.
+    if gray.dtype.kind != "u":
+        return None
+    weights = np.asarray(matrices, dtype=np.float64)
+    if not np.array_equal(weights, np.round(weights)):
+        return None
+    bound = np.abs(weights).sum(axis=(1, 2)).max() * np.iinfo(gray.dtype).max
+    for dtype in (np.int16, np.int32):
+        if bound <= np.iinfo(dtype).max:
+            return dtype
+    return None
+
+
+def _integer_accumulate(acc, window, weight, tmp):
+    # Zero taps are skipped and unit taps need no multiply at all.
+    weight = int(weight)
+    if weight == 1:
+        np.add(acc, window, out=acc)
+    elif weight == -1:
+        np.subtract(acc, window, out=acc)
+    elif weight:
+        np.multiply(window, acc.dtype.type(weight), out=tmp)
+        acc += tmp
+
+
+def gradient_magnitude(gray, weight_matrix, second_matrix, out=None, scratch=None):
+    h, w = gray.shape
+    if out is None:
+        out = np.empty((h, w), dtype=np.float32)
+    out.fill(0)
+    if h < 3 or w < 3:
+        return out
+
+    dtype = integer_accumulator(gray, weight_matrix, second_matrix)
+    accumulate = _integer_accumulate if dtype else _accumulate
+    dtype = dtype or np.float32
+    gx = scratch_buffer(scratch, "gx", (h - 2, w - 2), dtype)
+    gy = scratch_buffer(scratch, "gy", (h - 2, w - 2), dtype)
+    tmp = scratch_buffer(scratch, "product", (h - 2, w - 2), dtype)
+    gx.fill(0)
+    gy.fill(0)
+    for j in range(3):
+        for i in range(3):
+            window = gray[j:j + h - 2, i:i + w - 2]
+            accumulate(gx, window, weight_matrix[j][i], tmp)
+            accumulate(gy, window, second_matrix[j][i], tmp)
+
+    np.hypot(gx, gy, out=out[1:-1, 1:-1], dtype=np.float32)
+    return out
+
+
+def laplace_magnitude(gray, weight_matrix, out=None, scratch=None):
+    h, w = gray.shape
+    if out is None:
+        out = np.empty((h, w), dtype=np.float32)
+    out.fill(0)
+    if h < 3 or w < 3:
+        return out
+
+    dtype = integer_accumulator(gray, weight_matrix)
+    accumulate = _integer_accumulate if dtype else _accumulate
+    dtype = dtype or np.float32
+    acc = scratch_buffer(scratch, "acc", (h - 2, w - 2), dtype)
+    tmp = scratch_buffer(scratch, "product", (h - 2, w - 2), dtype)
+    acc.fill(0)
+    for j in range(3):
+        for i in range(3):
+            accumulate(acc, gray[j:j + h - 2, i:i + w - 2], weight_matrix[j][i], tmp)
+
+    np.abs(acc, out=out[1:-1, 1:-1])
+    return out
+
+
+def roberts_magnitude(gray, weight_matrix, out=None, scratch=None):
+    h, w = gray.shape
+    if out is None:
+        out = np.empty((h, w), dtype=np.float32)
+    out.fill(0)
+    if h < 2 or w < 2:
+        return out
+
+    second_matrix = [
+        [weight_matrix[0][1], -weight_matrix[0][0]],
+        [-weight_matrix[1][1], weight_matrix[1][0]]
+    ]
+    dtype = integer_accumulator(gray, weight_matrix, second_matrix)
+    accumulate = _integer_accumulate if dtype else _accumulate
+    dtype = dtype or np.float32
+    gx = scratch_buffer(scratch, "gx", (h - 1, w - 1), dtype)
+    gy = scratch_buffer(scratch, "gy", (h - 1, w - 1), dtype)
+    tmp = scratch_buffer(scratch, "product", (h - 1, w - 1), dtype)
+    gx.fill(0)
+    gy.fill(0)
+    for j in range(2):
+        for i in range(2):
+            window = gray[j:j + h - 1, i:i + w - 1]
+            accumulate(gx, window, weight_matrix[j][i], tmp)
+            accumulate(gy, window, second_matrix[j][i], tmp)
+
+    np.hypot(gx, gy, out=out[:-1, :-1], dtype=np.float32)
+    return out
+
+
+def quantize(src, max_value=255, dtype=np.uint8, out=None, scratch=None):
+    tmp = scratch_buffer(scratch, "quantize", src.shape)
+    np.trunc(src, out=tmp)
+    np.clip(tmp, 0, max_value, out=tmp)
+    if out is None:
+        return tmp.astype(dtype)
+    out[...] = tmp
+    return out
+
+
+def median_uint8(src, radius, out=None):
+    # Perreault and Hébert's constant-time median: every padded column keeps a
+    # histogram of the 2r+1 rows under the window, so moving down a row costs
+    # one removal and one insertion per column. The window histogram at each x
+    # is a difference of prefix sums over those columns, and the median is
+    # found on 16 coarse bins first and then on the 16 fine bins inside the
+    # chosen one. The work per pixel does not grow with the radius.
+    h, w = src.shape
+    size = 2 * radius + 1
+    half = size * size // 2
+    if out is None:
+        out = np.empty((h, w), dtype=np.uint8)
+    padded = pad_edge(src, radius, radius, radius, radius)
+    columns = np.arange(w + 2 * radius)
+    # Fine bins are grouped by coarse bin so each group is one contiguous block.
+    fine = np.zeros((16, len(columns), 16), dtype=np.int32)
+    coarse = np.zeros((len(columns), 16), dtype=np.int32)
+    for row in padded[:size]:
+        fine[row >> 4, columns, row & 15] += 1
+        coarse[columns, row >> 4] += 1
+
+    fine_prefix = np.zeros((len(columns) + 1, 16), dtype=np.int32)
+    coarse_prefix = np.zeros((len(columns) + 1, 16), dtype=np.int32)
+    x = np.arange(w)
+    for y in range(h):
+        if y:
+            old, new = padded[y - 1], padded[y + size - 1]
+            fine[old >> 4, columns, old & 15] -= 1
+            fine[new >> 4, columns, new & 15] += 1
+            coarse[columns, old >> 4] -= 1
+            coarse[columns, new >> 4] += 1
+        np.cumsum(coarse, axis=0, out=coarse_prefix[1:])
+        window = coarse_prefix[size:] - coarse_prefix[:-size]
+        counts = np.cumsum(window, axis=1)
+        high = np.argmax(counts > half, axis=1)
+        below = counts[x, high] - window[x, high]
+
+        # Only the coarse bins that hold a median in this row need fine sums.
+        for part in np.unique(high):
+            pick = np.flatnonzero(high == part)
+            np.cumsum(fine[part], axis=0, out=fine_prefix[1:])
+            counts = below[pick, None] + np.cumsum(fine_prefix[pick + size] - fine_prefix[pick], axis=1)
+            out[y, pick] = part * 16 + np.argmax(counts > half, axis=1)
+    return out
+
+
+MEDIAN_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def median_generic(src, radius, out=None, chunk_bytes=MEDIAN_CHUNK_BYTES):
+    # Any dtype: sorts each window, so the cost grows with the window area.
+    # Every output row copies its windows once for the reshape and once more
+    # for the partition inside np.median, so chunks are sized by that footprint.
+    h, w = src.shape
+    size = 2 * radius + 1
+    if out is None:
+        out = np.empty((h, w), dtype=src.dtype)
+    row_bytes = 2 * w * size * size * src.itemsize
+    rows_per_chunk = max(1, chunk_bytes // row_bytes)
+    padded = pad_edge(src, radius, radius, radius, radius)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (size, size))
+    for start in range(0, h, rows_per_chunk):
+        chunk = windows[start:start + rows_per_chunk].reshape(-1, w, size * size)
+        out[start:start + rows_per_chunk] = np.median(chunk, axis=2)
+    return out
+
+
+def young_van_vliet(sigma):
+    # Coefficients of Young and van Vliet's third-order recursive Gaussian,
+    # normalised so that the filter has unit gain.
+    if sigma < 0.5:
+        raise ValueError("The recursive Gaussian needs sigma >= 0.5")
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * np.sqrt(1 - 0.26891 * sigma)
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+    feedback = (b1 / b0, b2 / b0, b3 / b0)
+    return 1 - sum(feedback), feedback
+
+
+def _right_boundary(gain, feedback, sigma):
+    # How the anticausal pass starts at the right edge, given the causal state
+    # left over there, for a signal clamped to its last value (Triggs and Sdika).
+    # The tails are run out numerically once per sigma instead of per pixel.
+    a1, a2, a3 = feedback
+    length = int(12 * sigma) + 64
+    matrix = np.zeros((3, 3))
+    for k in range(3):
+        w = np.zeros(length + 3)
+        w[2 - k] = 1.0
+        for n in range(3, length + 3):
+            w[n] = a1 * w[n - 1] + a2 * w[n - 2] + a3 * w[n - 3]
+        y = np.zeros(length + 6)
+        for n in range(length + 2, 2, -1):
+            y[n] = gain * w[n] + a1 * y[n + 1] + a2 * y[n + 2] + a3 * y[n + 3]
+        matrix[:, k] = y[3:6]
+    return matrix
+
+
+def _recursive_pass(data, gain, feedback, boundary):
+    # Filters along axis 0; every step works on a whole row of the other axes.
+    a1, a2, a3 = feedback
+    n = data.shape[0]
+    forward = np.empty((n + 3,) + data.shape[1:])
+    forward[:3] = data[0]
+    for i in range(n):
+        forward[i + 3] = gain * data[i] + a1 * forward[i + 2] + a2 * forward[i + 1] + a3 * forward[i]
+
+    backward = np.empty((n + 3,) + data.shape[1:])
+    edge = data[-1]
+    state = forward[[n + 2, n + 1, n]] - edge
+    backward[n:] = edge + np.tensordot(boundary, state, axes=1)
+    for i in range(n - 1, -1, -1):
+        backward[i] = gain * forward[i + 3] + a1 * backward[i + 1] + a2 * backward[i + 2] + a3 * backward[i + 3]
+    return backward[:n]
+
+
+def recursive_gaussian(src, sigma, out=None):
+    # A causal and an anticausal third-order pass per axis: six multiply-adds
+    # per pixel and axis whatever sigma is, with clamp-to-edge borders.
+    gain, feedback = young_van_vliet(sigma)
+    boundary = _right_boundary(gain, feedback, sigma)
+    rows = _recursive_pass(src.astype(np.float64), gain, feedback, boundary)
+    columns = _recursive_pass(np.ascontiguousarray(np.swapaxes(rows, 0, 1)), gain, feedback, boundary)
+    if out is None:
+        out = np.empty(src.shape, dtype=np.float32)
+    out[...] = np.swapaxes(columns, 0, 1)
+    return out
+
+
+def symmetric_blur(src, taps, out=None):
+    # A symmetric 1D kernel along both axes with clamped borders. Mirrored taps
+    # share one multiply, which saves almost half the work of correlate.
+    taps = np.asarray(taps, dtype=np.float32)
+    r = len(taps) // 2
+    h, w = src.shape
+    padded = pad_edge(src, r, r, r, r)
+    rows = np.multiply(padded[r:r + h], taps[r])
+    tmp = np.empty_like(rows)
+    for i in range(r):
+        np.add(padded[i:i + h], padded[2 * r - i:2 * r - i + h], out=tmp)
+        tmp *= taps[i]
+        rows += tmp
+    if out is None:
+        out = np.empty((h, w), dtype=np.float32)
+    np.multiply(rows[:, r:r + w], taps[r], out=out)
+    tmp = tmp[:, :w]
+    for i in range(r):
+        np.add(rows[:, i:i + w], rows[:, 2 * r - i:2 * r - i + w], out=tmp)
+        tmp *= taps[i]
+        out += tmp
+    return out
+
+
+def _blur_grid(grid, axis):
+    # [1, 4, 6, 4, 1] / 16 along one axis: a Gaussian of one grid cell. The
+    # grid has two empty cells on each side, so the shifts need no clamping.
+    grid = np.moveaxis(grid, axis, 0)
+    out = grid * np.float32(6 / 16)
+    out[1:] += grid[:-1] * np.float32(4 / 16)
+    out[:-1] += grid[1:] * np.float32(4 / 16)
+    out[2:] += grid[:-2] * np.float32(1 / 16)
+    out[:-2] += grid[2:] * np.float32(1 / 16)
+    return np.moveaxis(out, 0, axis)
+
+
+def _cell(coordinate, spacing):
+    # Grid cell below each coordinate and the fraction towards the next one;
+    # coordinates are non-negative, so truncation is the floor.
+    position = coordinate * np.float32(1 / spacing) + np.float32(2)
+    low = position.astype(np.intp)
+    return low, position - low.astype(np.float32)
+
+
+def _splat(values, y, x, z, shape):
+    # Value sums and weights share one complex grid, so blurring and slicing
+    # handle both in the same pass.
+    keys = ((y[:, None] * shape[1] + x) * shape[2] + z).ravel()
+    size = shape[0] * shape[1] * shape[2]
+    grid = np.bincount(keys, weights=values.ravel(), minlength=size).astype(np.complex64)
+    grid.imag = np.bincount(keys, minlength=size)
+    grid = grid.reshape(shape)
+    for axis in range(3):
+        grid = _blur_grid(grid, axis)
+    return grid.ravel()
+
+
+def _slice(grid, y, x, z, columns, depth):
+    (y0, fy), (x0, fx), (z0, fz) = y, x, z
+    base = (y0[:, None] * columns + x0) * depth + z0
+    fy = fy[:, None]
+    result = np.zeros(base.shape, dtype=np.complex64)
+    for offset, weight in ((0, (1 - fy) * (1 - fx)), (depth, (1 - fy) * fx),
+                           (columns * depth, fy * (1 - fx)), ((columns + 1) * depth, fy * fx)):
+        lower = grid[base + offset]
+        upper = grid[base + (offset + 1)]
+        upper -= lower
+        upper *= fz
+        upper += lower
+        upper *= weight
+        result += upper
+    return result.real / np.maximum(result.imag, np.float32(1e-12))
+
+
+# Cells in one band of the bilateral grid. The splat and blur temporaries take
+# about 40 bytes per cell, so a band stays around 300 MiB at most.
+BILATERAL_BAND_CELLS = 2 ** 23
+
+
+def bilateral_grid(src, sigma_spatial, sigma_range, rows_per_chunk=64):
+    # Paris and Durand's bilateral grid: pixels are splatted into a coarse
+    # (y, x, value) grid with one cell per sigma, the grid is blurred, and each
+    # pixel reads its result back by trilinear interpolation. Splatting and
+    # slicing cost the same for any sigma; only the small grid depends on it.
+    # The grid is built in bands of rows so it stays in cache.
+    h, w = src.shape
+    values = src.astype(np.float32)
+    low_value = float(values.min())
+    values -= np.float32(low_value)
+    columns = int((w - 1) / sigma_spatial) + 5
+    depth = int(float(values.max()) / sigma_range) + 5
+    band_rows = BILATERAL_BAND_CELLS // (columns * depth) - 5
+    if band_rows < 1:
+        raise ValueError(f"A bilateral grid row would need {columns * depth} cells, more than a band of "
+                         f"{BILATERAL_BAND_CELLS} holds; raise the range or spatial sigma")
+    y0, fy = _cell(np.arange(h, dtype=np.float32), sigma_spatial)
+    x0, fx = _cell(np.arange(w, dtype=np.float32), sigma_spatial)
+    nearest_y = y0 + (fy >= 0.5)
+    nearest_x = x0 + (fx >= 0.5)
+    step = max(1, min(int(rows_per_chunk / sigma_spatial), band_rows, y0[-1] - y0[0] + 1))
+    out = np.empty((h, w), dtype=np.float32)
+    for first in range(y0[0], y0[-1] + 1, step):
+        # Slicing grid rows [first, first + step] needs the blurred band, which
+        # reaches two rows further on each side.
+        top = first - 2
+        splat = slice(*np.searchsorted(nearest_y, (top, first + step + 3)))
+        rows = slice(*np.searchsorted(y0, (first, first + step)))
+        inner = slice(rows.start - splat.start, rows.stop - splat.start)
+        z0, fz = _cell(values[splat], sigma_range)
+        grid = _splat(values[splat], nearest_y[splat] - top, nearest_x, z0 + (fz >= 0.5), (step + 5, columns, depth))
+        out[rows] = _slice(grid, (y0[rows] - top, fy[rows]), (x0, fx), (z0[inner], fz[inner]), columns, depth)
+    out += np.float32(low_value)
+    return out
+
+
+def reduce_half(src, taps):
+    # symmetric_blur followed by dropping every other row and column, with only
+    # the kept samples computed: each pass does half the work of a full blur.
+    taps = np.asarray(taps, dtype=np.float32)
+    r = len(taps) // 2
+    h, w = src.shape
+    padded = pad_edge(src, r, r, r, r)
+    rows = np.multiply(padded[r:r + h:2], taps[r])
+    tmp = np.empty_like(rows)
+    for i in range(r):
+        np.add(padded[i:i + h:2], padded[2 * r - i:2 * r - i + h:2], out=tmp)
+        tmp *= taps[i]
+        rows += tmp
+    out = np.multiply(rows[:, r:r + w:2], taps[r])
+    tmp = np.empty_like(out)
+    for i in range(r):
+        np.add(rows[:, i:i + w:2], rows[:, 2 * r - i:2 * r - i + w:2], out=tmp)
+        tmp *= taps[i]
+        out += tmp
+    return out
+
+
+def reduce_binomial(src):
+    # reduce_half with the integer taps 1 4 6 4 1 (a Gaussian of sigma 1) on
+    # unsigned integer pixels. Sums fit the next wider unsigned type, and one
+    # rounding shift at the end brings them back to the input type.
+    wide = np.uint16 if src.dtype == np.uint8 else np.uint32
+    h, w = src.shape
+    padded = pad_edge(src, 2, 2, 2, 2)
+    rows = padded[2:h + 2:2].astype(wide)
+    rows *= wide(6)
+    tmp = np.add(padded[1:h + 1:2], padded[3:h + 3:2], dtype=wide)
+    tmp *= wide(4)
+    rows += tmp
+    np.add(padded[0:h:2], padded[4:h + 4:2], out=tmp, dtype=wide)
+    rows += tmp
+    out = rows[:, 2:w + 2:2] * wide(6)
+    tmp = np.add(rows[:, 1:w + 1:2], rows[:, 3:w + 3:2])
+    tmp *= wide(4)
+    out += tmp
+    np.add(rows[:, 0:w:2], rows[:, 4:w + 4:2], out=tmp)
+    out += tmp
+    out += wide(128)
+    out >>= wide(8)
+    return out.astype(src.dtype)
+
+
+def expand_double(src, shape):
+    # Inverse of the decimation in reduce_half: kept samples return to the even
+    # positions and odd positions are the mean of their neighbours, clamped at
+    # the far edge.
+    h, w = shape
+    src = src.astype(np.float32, copy=False)
+    rows = np.empty((h, src.shape[1]), dtype=np.float32)
+    rows[::2] = src[:(h + 1) // 2]
+    below = np.concatenate((src[1:], src[-1:]))
+    np.add(src, below, out=below)
+    below *= np.float32(0.5)
+    rows[1::2] = below[:h // 2]
+    out = np.empty((h, w), dtype=np.float32)
+    out[:, ::2] = rows[:, :(w + 1) // 2]
+    right = np.concatenate((rows[:, 1:], rows[:, -1:]), axis=1)
+    np.add(rows, right, out=right)
+    right *= np.float32(0.5)
+    out[:, 1::2] = right[:, :w // 2]
+    return out
+
+
+def gradient_components(gray, side, centre):
+    # Sobel-type gradients from their separable form: smoothing with
+    # (side, centre, side) across and a central difference along each axis.
+    padded = pad_edge(gray, 1, 1, 1, 1)
+    across = padded[:-2] + padded[2:]
+    across *= np.float32(side)
+    across += np.float32(centre) * padded[1:-1]
+    gx = across[:, 2:] - across[:, :-2]
+    across = padded[:, :-2] + padded[:, 2:]
+    across *= np.float32(side)
+    across += np.float32(centre) * padded[:, 1:-1]
+    gy = across[2:] - across[:-2]
+    return gx, gy
+
+
+def suppress_non_maxima(magnitude, gx, gy, rows):
+    # Non-maximum suppression for the rows slice of a strip: a pixel stays when
+    # it is a maximum along its gradient direction, rounded to one of four
+    # neighbour pairs. Ties keep the first pixel of a plateau, so edges stay one
+    # pixel wide. Rows just outside the slice are read from the strip, and
+    # zeros lie beyond it.
+    padded = np.pad(magnitude, 1)
+    up, middle, down = (padded[rows.start + i:rows.stop + i] for i in range(3))
+    centre, x, y = magnitude[rows], gx[rows], gy[rows]
+
+    def keep(before, after):
+        result = centre > before
+        result &= centre >= after
+        return result
+
+    tan_22_5 = np.float32(0.41421356)
+    ax, ay = np.abs(x), np.abs(y)
+    horizontal = ay <= ax * tan_22_5
+    vertical = ax <= ay * tan_22_5
+    # Main diagonal when the components share a sign, anti-diagonal otherwise.
+    thin = np.where((x > 0) == (y > 0), keep(up[:, :-2], down[:, 2:]), keep(up[:, 2:], down[:, :-2]))
+    thin = np.where(vertical, keep(up[:, 1:-1], down[:, 1:-1]), thin)
+    return np.where(horizontal, keep(middle[:, :-2], middle[:, 2:]), thin)
+
+
+def _component_roots(first, second, count):
+    # Hook-and-compress connected components on an edge list: each round hooks
+    # the larger root of every edge with different roots under the smaller one
+    # and then jumps pointers until every pixel points at its root.
+    parent = np.arange(count, dtype=np.int32)
+    while True:
+        a, b = parent[first], parent[second]
+        differ = a != b
+        if not differ.any():
+            return parent
+        a, b = a[differ], b[differ]
+        parent[np.maximum(a, b)] = np.minimum(a, b)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def connected_strong(weak, strong):
+    # Hysteresis: keeps the strong pixels and every weak pixel 8-connected to
+    # one. Only the weak pixels that are not strong are labelled, and a label
+    # survives when one of its pixels touches a strong pixel.
+    h, w = weak.shape
+    width = w + 2
+    strong = np.pad(strong, 1).ravel()
+    index = np.flatnonzero(np.pad(weak, 1).ravel() & ~strong).astype(np.int32)
+    # Position of every weak pixel in index, or -1, so neighbours are one gather.
+    position = np.full(strong.size, -1, dtype=np.int32)
+    position[index] = np.arange(len(index), dtype=np.int32)
+    first, second = [], []
+    touched = np.zeros(len(index), dtype=bool)
+    for offset in (1, width - 1, width, width + 1):
+        found = position[index + offset]
+        linked = np.flatnonzero(found >= 0).astype(np.int32)
+        first.append(linked)
+        second.append(found[linked])
+        touched |= strong[index + offset]
+        touched |= strong[index - offset]
+    roots = _component_roots(np.concatenate(first), np.concatenate(second), len(index))
+    kept = np.zeros(len(index), dtype=bool)
+    kept[roots[touched]] = True
+    strong[index[kept[roots]]] = True
+    return strong.reshape(h + 2, width)[1:-1, 1:-1]
@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from PIL import Image
+from pipeline import Pipeline, parse_step
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+Y4M_CHROMA = {"420": (2, 2), "420jpeg": (2, 2), "420paldv": (2, 2), "420mpeg2": (2, 2), "422": (2, 1), "444": (1, 1)}
+
+_END = object()
+
+
+def read_directory(path):
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    for name in names:
+        image = Image.open(os.path.join(path, name))
+        image.load()
+        yield image
+
+
+class Y4MReader:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.readline().split()
+        if not header or header[0] != b"YUV4MPEG2":
+            self._file.close()
+            raise ValueError(f"{path} is not a YUV4MPEG2 file")
+        fields = {token[:1].decode(): token[1:].decode() for token in header[1:]}
+        self.width = int(fields["W"])
+        self.height = int(fields["H"])
+        self.frame_rate = fields.get("F", "25:1")
+        self.chroma = fields.get("C", "420jpeg")
+        if self.chroma != "mono" and self.chroma not in Y4M_CHROMA:
+            self._file.close()
+            raise ValueError(f"Unsupported Y4M colour space: C{self.chroma}")
+
+    def _plane_sizes(self):
+        luma = (self.width, self.height)
+        if self.chroma == "mono":
+            return [luma]
+        step_x, step_y = Y4M_CHROMA[self.chroma]
+        chroma = (-(-self.width // step_x), -(-self.height // step_y))
+        return [luma, chroma, chroma]
+
+    def __iter__(self):
+        sizes = self._plane_sizes()
+        try:
+            while True:
+                marker = self._file.readline()
+                if not marker:
+                    return
+                if not marker.startswith(b"FRAME"):
+                    raise ValueError(f"Corrupt Y4M frame header in {self.path}")
+                planes = []
+                for size in sizes:
+                    data = self._file.read(size[0] * size[1])
+                    if len(data) < size[0] * size[1]:
+                        raise ValueError(f"Truncated Y4M frame in {self.path}")
+                    planes.append(Image.frombytes("L", size, data))
+                if len(planes) == 1:
+                    yield planes[0]
+                else:
+                    full = (self.width, self.height)
+                    planes = [planes[0]] + [plane.resize(full, Image.NEAREST) for plane in planes[1:]]
+                    yield Image.merge("YCbCr", planes).convert("RGB")
+        finally:
+            self._file.close()
+
+
+def read_frames(path):
+    if os.path.isdir(path):
+        return read_directory(path)
+    if path.lower().endswith(".y4m"):
+        return Y4MReader(path)
+    raise ValueError(f"Expected a directory of images or a .y4m file: {path}")
+
+
+class DirectoryWriter:
+    def __init__(self, path, extension="png"):
+        self.path = path
+        self.extension = extension
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, index, image):
+        image.save(os.path.join(self.path, f"frame_{index:06d}.{self.extension}"))
+
+    def close(self):
+        pass
+
+
+class Y4MWriter:
+    def __init__(self, path, frame_rate="25:1"):
+        self.path = path
+        self.frame_rate = frame_rate
+        self._file = open(path, "wb")
+        self._size = None
+        self._mode = None
+
+    def write(self, index, image):
+        if image.mode not in ("L", "RGB"):
+            raise ValueError(f"Y4M output supports 8-bit frames only, got {image.mode}")
+        if self._size is None:
+            self._size = image.size
+            self._mode = image.mode
+            chroma = "mono" if image.mode == "L" else "444"
+            self._file.write(f"YUV4MPEG2 W{image.width} H{image.height} F{self.frame_rate} Ip A1:1 "
+                             f"C{chroma}\n".encode())
+        elif image.size != self._size or image.mode != self._mode:
+            raise ValueError("All frames of a Y4M stream must have the same size and mode")
+        self._file.write(b"FRAME\n")
+        if image.mode == "L":
+            self._file.write(image.tobytes())
+        else:
+            for plane in image.convert("YCbCr").split():
+                self._file.write(plane.tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+def open_writer(path, frame_rate="25:1"):
+    if path.lower().endswith(".y4m"):
+        return Y4MWriter(path, frame_rate)
+    return DirectoryWriter(path)
+
+
+class Stage(threading.Thread):
+    def __init__(self, name, func, source, stop, maxsize=4):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.source = source
+        self.stop = stop
+        self.output = queue.Queue(maxsize)
+        self.items = 0
+        self.busy_s = 0.0
+        self.error = None
+
+    def _items(self):
+        if not isinstance(self.source, queue.Queue):
+            yield from self.source
+            return
+        while not self.stop.is_set():
+            try:
+                item = self.source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def _put(self, item):
+        # Bounded queues apply back-pressure; the timeout lets a blocked stage
+        # notice that another stage failed instead of waiting forever.
+        while not self.stop.is_set():
+            try:
+                self.output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(self):
+        try:
+            items = self._items()
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                if isinstance(self.source, queue.Queue):
+                    # Waiting for the previous stage is not this stage's work;
+                    # reading from an iterable source (decoding) is.
+                    start = time.perf_counter()
+                result = self.func(item)
+                self.busy_s += time.perf_counter() - start
+                self.items += 1
+                if not self._put(result):
+                    break
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            self._put(_END)
+
+
+class MapStage(Stage):
+    # Hands the whole item stream to func, which yields (result, seconds) pairs in
+    # input order. For executors that keep their own work in flight.
+    def run(self):
+        results = self.func(self._items())
+        try:
+            for result, seconds in results:
+                self.busy_s += seconds
+                self.items += 1
+                if not self._put(result):
+                    return
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            results.close()
+            self._put(_END)
+
+
+def _timed(func, item):
+    start = time.perf_counter()
+    result = func(item)
+    return result, time.perf_counter() - start
+
+
+class PoolStage(Stage):
+    # Runs func on an executor with up to in_flight items outstanding, so several
+    # workers serve one stage, and passes the results on in input order.
+    def __init__(self, name, func, source, stop, executor, in_flight, maxsize=4):
+        super().__init__(name, func, source, stop, maxsize)
+        self.executor = executor
+        self.in_flight = in_flight
+
+    def _result(self, future):
+        result, seconds = future.result()
+        self.busy_s += seconds
+        self.items += 1
+        return result
+
+    def run(self):
+        pending = deque()
+        try:
+            for item in self._items():
+                pending.append(self.executor.submit(_timed, self.func, item))
+                if len(pending) >= self.in_flight and not self._put(self._result(pending.popleft())):
+                    return
+            while pending:
+                if not self._put(self._result(pending.popleft())):
+                    return
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            for future in pending:
+                future.cancel()
+            self._put(_END)
+
+
+def _step(func, values):
+    def run(item):
+        index, image = item
+        return index, func(image, *values)
+    return run
+
+
+def _writer(writer):
+    def run(item):
+        writer.write(*item)
+        return item[0]
+    return run
+
+
+def build_stages(frames, spec, writer, queue_size=4):
+    stop = threading.Event()
+    # The first stage decodes frames, so reading overlaps with processing.
+    stages = [Stage("read", lambda item: item, enumerate(frames), stop, queue_size)]
+    # Stages are numbered, so repeated operations keep their own statistics.
+    for index, (stage_name, func, values) in enumerate(Pipeline.from_spec(None, spec).plan(), 1):
+        stages.append(Stage(f"{index}:{stage_name}", _step(func, values), stages[-1].output, stop, queue_size))
+    stages.append(Stage("write", _writer(writer), stages[-1].output, stop, queue_size))
+    return stages
+
+
+def run_stages(stages, progress=None, progress_interval=1.0):
+    start = time.perf_counter()
+    for stage in stages:
+        stage.start()
+
+    written = 0
+    last_report = start
+    output = stages[-1].output
+    while True:
+        try:
+            item = output.get(timeout=0.1)
+        except queue.Empty:
+            if stages[-1].is_alive():
+                continue
+            break
+        if item is _END:
+            break
+        written += 1
+        now = time.perf_counter()
+        if progress and now - last_report >= progress_interval:
+            progress(written, written / (now - start))
+            last_report = now
+
+    for stage in stages:
+        stage.join()
+    for stage in stages:
+        if stage.error is not None:
+            raise stage.error
+    return written, time.perf_counter() - start
+
+
+def run_stream(frames, spec, writer, queue_size=4, progress=None, progress_interval=1.0):
+    stages = build_stages(frames, spec, writer, queue_size)
+    try:
+        written, elapsed = run_stages(stages, progress, progress_interval)
+    finally:
+        writer.close()
+    return {
+        "frames": written,
+        "elapsed_s": elapsed,
+        "fps": written / elapsed if elapsed > 0 else None,
+        "stages": {stage.name: {"frames": stage.items,
+                                "ms_per_frame": stage.busy_s / stage.items * 1000 if stage.items else None}
+                   for stage in stages},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Process an image sequence or a Y4M video frame by frame with pipelined stages.")
+    parser.add_argument("input", help="directory of images or a .y4m file")
+    parser.add_argument("output", help="output directory (PNG frames) or a .y4m file")
+    parser.add_argument("steps", nargs="*", help="operation steps, e.g. grayscale gaussian:kernel_size=5,sigma=1.5 sobel")
+    parser.add_argument("--spec", help="JSON file with a list of {\"op\": name, ...params} steps")
+    parser.add_argument("--queue-size", type=int, default=4, help="frames buffered between stages")
+    args = parser.parse_args(argv)
+
+    spec = [parse_step(step) for step in args.steps]
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f) + spec
+
+    frames = read_frames(args.input)
+    writer = open_writer(args.output, getattr(frames, "frame_rate", "25:1"))
+    stats = run_stream(frames, spec, writer, args.queue_size,
+                       progress=lambda count, fps: print(f"{count} frames, {fps:.1f} fps"))
+
+    print(f"Processed {stats['frames']} frames in {stats['elapsed_s']:.2f} s ({stats['fps'] or 0:.1f} fps)")
+    for name, stage in stats["stages"].items():
+        if stage["ms_per_frame"] is not None:
+            print(f"  {name:<20} {stage['ms_per_frame']:8.2f} ms/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,15 @@
-from PIL import Image
 import math
+import numpy as np
+from bit_depth import working_mode, max_value, to_array, from_array
+from fast_kernels import correlate, median_uint8, median_generic, recursive_gaussian, bilateral_grid
+
+# Below this radius sorting the few values of each window beats the sliding
+# histogram, whose cost per pixel is constant but larger.
+SLIDING_MEDIAN_MIN_RADIUS = 4
+GAUSSIAN_METHODS = ("dense", "recursive")
+# Below this the recursive filter is several grey levels off on textured input,
+# while a dense kernel has at most 13 taps, so smaller sigmas use the dense one.
+RECURSIVE_MIN_SIGMA = 2.0
 
 
 def kernel_of_the_gauss(kernel_size, sigma):
@@ -32,95 +42,72 @@ def sharpening_kernel(kernel_size, intensity):
     return ker
 
 
-def apply_averaging_filter(img, k_size):
-    img = img.convert("RGB")
-    w, h = img.size
-    new_img = img.copy()
-    pix = img.load()
-    new_pix = new_img.load()
+def _convolve(img, kernel):
+    mode = working_mode(img)
+    pixels = to_array(img).astype(np.float32)
+    return from_array(correlate(pixels, kernel), mode)
+
 
+def apply_averaging_filter(img, k_size):
     val = 1.0 / (k_size * k_size)
     kernel = [[val for _ in range(k_size)] for _ in range(k_size)]
-
-    off = k_size // 2
-
-    for y in range(h):
-        for x in range(w):
-            r_sum = 0.0
-            g_sum = 0.0
-            b_sum = 0.0
-
-            for j in range(-off, off + 1):
-                for i in range(-off, off + 1):
-                    xi = min(max(x + i, 0), w - 1)
-                    yj = min(max(y + j, 0), h - 1)
-                    r, g, b = pix[xi, yj]
-                    weight = kernel[j + off][i + off]
-                    r_sum += r * weight
-                    g_sum += g * weight
-                    b_sum += b * weight
-            new_pix[x, y] = (int(r_sum), int(g_sum), int(b_sum))
-
-    return new_img
+    return _convolve(img, kernel)
 
 
 def apply_sharpening_filter(img, k_size, inten):
-    img = img.convert("RGB")
-    w, h = img.size
-    new_img = Image.new("RGB", (w, h))
-    pix = img.load()
-    new_pix = new_img.load()
-
     ker = sharpening_kernel(k_size, inten)
-    mid = k_size // 2
-
-    for y in range(h):
-        for x in range(w):
-            sum_r = 0.0
-            sum_g = 0.0
-            sum_b = 0.0
-
-            for j in range(-mid, mid + 1):
-                for i in range(-mid, mid + 1):
-                    xi = min(max(x + i, 0), w - 1)
-                    yj = min(max(y + j, 0), h - 1)
-                    r, g, b = pix[xi, yj]
-                    weight = ker[j + mid][i + mid]
-                    sum_r += r * weight
-                    sum_g += g * weight
-                    sum_b += b * weight
-
-            new_r = min(255, max(0, int(sum_r)))
-            new_g = min(255, max(0, int(sum_g)))
-            new_b = min(255, max(0, int(sum_b)))
-            new_pix[x, y] = (new_r, new_g, new_b)
-
-    return new_img
-
-
-def apply_gaussian_filter(image, kernel_size, sigma):
-    image = image.convert("RGB")
-    width, height = image.size
-    result_img = Image.new("RGB", (width, height))
-    pixels = image.load()
-    result_pixels = result_img.load()
-
+    return _convolve(img, ker)
+
+
+def gaussian_kernel_size(sigma):
+    # Covers +-3 sigma, which holds 99.7% of the weight.
+    return 2 * math.ceil(3 * sigma) + 1
+
+
+def apply_gaussian_filter(image, kernel_size, sigma, method="dense"):
+    if method not in GAUSSIAN_METHODS:
+        raise ValueError(f"Unknown Gaussian method '{method}', expected one of: {', '.join(GAUSSIAN_METHODS)}")
+    if method == "recursive":
+        # Young-van Vliet IIR: the support follows from sigma and the cost per
+        # pixel is the same for any sigma, so kernel_size is ignored.
+        if sigma >= RECURSIVE_MIN_SIGMA:
+            mode = working_mode(image)
+            return from_array(recursive_gaussian(to_array(image), sigma), mode)
+        kernel_size = None
+    if kernel_size is None:
+        kernel_size = gaussian_kernel_size(sigma)
     kernel = kernel_of_the_gauss(kernel_size, sigma)
-    offset = kernel_size // 2
-
-    for y in range(height):
-        for x in range(width):
-            r_acc = 0.0
-            g_acc = 0.0
-            b_acc = 0.0
-            for ky in range(-offset, offset + 1):
-                for kx in range(-offset, offset + 1):
-                    px = min(max(x + kx, 0), width - 1)
-                    py = min(max(y + ky, 0), height - 1)
-                    r, g, b = pixels[px, py]
-                    weight = kernel[ky + offset][kx + offset]
-                    r_acc += r * weight
-                    g_acc += g * weight
-                    b_acc += b * weight
-            result_pixels[x, y] = (int(r_acc), int(g_acc), int(b_acc))
-    return result_img
+    return _convolve(image, kernel)
+
+
+def apply_median_filter(img, k_size):
+    if k_size < 1 or k_size % 2 == 0:
+        raise ValueError("Kernel size must be an odd positive integer")
+    mode = working_mode(img)
+    pixels = to_array(img)
+    radius = k_size // 2
+    planes = pixels[..., None] if pixels.ndim == 2 else pixels
+    out = np.empty_like(planes)
+    for c in range(planes.shape[2]):
+        plane = np.ascontiguousarray(planes[..., c])
+        if plane.dtype == np.uint8 and radius >= SLIDING_MEDIAN_MIN_RADIUS:
+            median_uint8(plane, radius, out[..., c])
+        else:
+            median_generic(plane, radius, out[..., c])
+    return from_array(out.reshape(pixels.shape), mode)
+
+
+def apply_bilateral_filter(img, sigma_spatial, sigma_range=0.1):
+    # sigma_range is a fraction of the value range, so the same setting works
+    # for 8-bit, 16-bit and float images.
+    if sigma_spatial < 1:
+        raise ValueError("Spatial sigma must be at least 1 pixel")
+    if not 0 < sigma_range <= 1:
+        raise ValueError("Range sigma must be in (0, 1]")
+    mode = working_mode(img)
+    pixels = to_array(img)
+    planes = pixels[..., None] if pixels.ndim == 2 else pixels
+    out = np.empty(planes.shape, dtype=np.float32)
+    for c in range(planes.shape[2]):
+        out[..., c] = bilateral_grid(planes[..., c], sigma_spatial, sigma_range * max_value(mode))
+    return from_array(out.reshape(pixels.shape), mode)
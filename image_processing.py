@@ -1,76 +1,52 @@
+import numpy as np
 from PIL import Image
+from bit_depth import working_mode, max_value, to_array, from_array
 
 class ImageProcessor:
     @staticmethod
     def to_grayscale(img: Image.Image) -> Image.Image:
-        width, height = img.size
-        gray_img = Image.new("RGB", (width, height))
-        pixels = img.load()
-        gray_pixels = gray_img.load()
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                gray = int(0.299 * r + 0.587 * g + 0.114 * b)
-                gray_pixels[x, y] = (gray, gray, gray)
-        return gray_img
+        mode = working_mode(img)
+        if mode != "RGB":
+            return from_array(to_array(img).copy(), mode)
+        rgb = to_array(img)
+        gray = 0.299 * rgb[..., 0]
+        gray += 0.587 * rgb[..., 1]
+        gray += 0.114 * rgb[..., 2]
+        return from_array(gray, "L")
 
     @staticmethod
     def to_negative(img: Image.Image) -> Image.Image:
-        width, height = img.size
-        negative_img = Image.new("RGB", (width, height))
-        pixels = img.load()
-        negative_pixels = negative_img.load()
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                negative_pixels[x, y] = (255 - r, 255 - g, 255 - b)
-        return negative_img
+        limit = max_value(working_mode(img))
+        return ImageProcessor._map_levels(img, lambda v: limit - v)
 
     @staticmethod
     def adjust_brightness(img: Image.Image, factor: float) -> Image.Image:
-        width, height = img.size
-        result_img = Image.new("RGB", (width, height))
-        pixels = img.load()
-        result_pixels = result_img.load()
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                r = min(255, max(0, int(r * factor)))
-                g = min(255, max(0, int(g * factor)))
-                b = min(255, max(0, int(b * factor)))
-                result_pixels[x, y] = (r, g, b)
-        return result_img
+        return ImageProcessor._map_levels(img, lambda v: v * factor)
 
     @staticmethod
     def adjust_contrast(img: Image.Image, factor: float) -> Image.Image:
-        width, height = img.size
-        result_img = Image.new("RGB", (width, height))
-        pixels = img.load()
-        result_pixels = result_img.load()
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                nr = 128 + factor * (r - 128)
-                ng = 128 + factor * (g - 128)
-                nb = 128 + factor * (b - 128)
-                nr = max(0, min(255, int(nr)))
-                ng = max(0, min(255, int(ng)))
-                nb = max(0, min(255, int(nb)))
-                result_pixels[x, y] = (nr, ng, nb)
-        return result_img
+        middle = ImageProcessor.middle_value(working_mode(img))
+        return ImageProcessor._map_levels(img, lambda v: middle + factor * (v - middle))
 
     @staticmethod
-    def binarize(img: Image.Image, threshold: int) -> Image.Image:
-        width, height = img.size
-        result_img = Image.new("RGB", (width, height))
-        pixels = img.load()
-        result_pixels = result_img.load()
-        for y in range(height):
-            for x in range(width):
-                r, g, b = pixels[x, y]
-                gray = int(0.299 * r + 0.587 * g + 0.114 * b)
-                if gray > threshold:
-                    result_pixels[x, y] = (255, 255, 255)
-                else:
-                    result_pixels[x, y] = (0, 0, 0)
-        return result_img
+    def binarize(img: Image.Image, threshold) -> Image.Image:
+        gray = to_array(ImageProcessor.to_grayscale(img))
+        return Image.fromarray(np.where(gray > threshold, 255, 0).astype(np.uint8))
+
+    @staticmethod
+    def middle_value(mode: str):
+        if mode == "F":
+            return 0.5
+        return (max_value(mode) + 1) // 2
+
+    @staticmethod
+    def _map_levels(img: Image.Image, func) -> Image.Image:
+        mode = working_mode(img)
+        pixels = to_array(img)
+        if mode == "F":
+            return from_array(func(pixels), mode)
+        # Integer images have few enough levels (256 or 65536) that evaluating the
+        # function once per level and indexing the table is exact and fastest.
+        levels = np.arange(max_value(mode) + 1, dtype=np.float64)
+        table = np.clip(np.trunc(func(levels)), 0, max_value(mode)).astype(pixels.dtype)
+        return from_array(table[pixels], mode)
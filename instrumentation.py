@@ -0,0 +1,93 @@
+import json
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+
+class OperationProfiler:
+    def __init__(self, history=100, track_memory=False):
+        self.records = deque(maxlen=history)
+        self.track_memory = track_memory
+        self._current = None
+
+    @contextmanager
+    def operation(self, name):
+        # Tracing slows every allocation, so it runs only while an operation is
+        # measured, and is left alone when someone else has started it.
+        started = self.track_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            start_memory, _ = tracemalloc.get_traced_memory()
+
+        record = {"operation": name, "time": time.time(), "stages": {}}
+        self._current = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["total_s"] = time.perf_counter() - start
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["peak_bytes"] = max(0, peak - start_memory)
+            if started:
+                tracemalloc.stop()
+            self._current = None
+            self.records.append(record)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                stages = self._current["stages"]
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+    def set_track_memory(self, enabled):
+        self.track_memory = enabled
+
+    def last(self):
+        return self.records[-1] if self.records else None
+
+    def summary(self):
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(record["operation"], {"count": 0, "total_s": [], "peak_bytes": 0,
+                                                             "stages": {}})
+            entry["count"] += 1
+            entry["total_s"].append(record["total_s"])
+            entry["peak_bytes"] = max(entry["peak_bytes"], record.get("peak_bytes", 0))
+            for stage, seconds in record["stages"].items():
+                entry["stages"].setdefault(stage, []).append(seconds)
+        return summary
+
+    def clear(self):
+        self.records.clear()
+
+    def export(self, path):
+        with open(path, "a") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+
+def format_record(record):
+    stages = ", ".join(f"{stage} {seconds * 1000:.0f}" for stage, seconds in record["stages"].items())
+    text = f"{record['operation']}: {record['total_s'] * 1000:.0f} ms ({stages})"
+    if "peak_bytes" in record:
+        text += f", peak {record['peak_bytes'] / 2 ** 20:.1f} MiB"
+    return text
+
+
+def format_summary(summary):
+    lines = [f"{'operation':<14}{'runs':>5}{'mean ms':>10}{'max ms':>10}{'peak MiB':>10}  stages (mean ms)"]
+    for name, entry in sorted(summary.items()):
+        totals = entry["total_s"]
+        stages = ", ".join(f"{stage} {sum(values) / len(values) * 1000:.0f}"
+                           for stage, values in entry["stages"].items())
+        lines.append(f"{name:<14}{entry['count']:>5}{sum(totals) / len(totals) * 1000:>10.1f}"
+                     f"{max(totals) * 1000:>10.1f}{entry['peak_bytes'] / 2 ** 20:>10.1f}  {stages}")
+    return "\n".join(lines)
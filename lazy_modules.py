@@ -0,0 +1,50 @@
+import importlib
+import threading
+import time
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+class Preloader:
+    def __init__(self, modules):
+        self.modules = list(modules)
+        self.elapsed = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="module-preload", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            for module in self.modules:
+                module.load()
+        except Exception as e:
+            # Surfaces again, on the main thread, when the module is first used.
+            self.error = e
+        self.elapsed = time.perf_counter() - start
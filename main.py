@@ -1,7 +1,29 @@
-from app import MainApp
+import time
 
-def main():
-    app = MainApp()
+STARTED = time.perf_counter()
+
+import argparse
+import os
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Biometrics image processing application.")
+    parser.add_argument("--profile", metavar="MODES",
+                        help="profile operations with cprofile, sample or all (also BIOMETRICS_PROFILE)")
+    parser.add_argument("--profile-dir", help="directory for profile dumps (also BIOMETRICS_PROFILE_DIR)")
+    parser.add_argument("--profile-ops", help="comma separated operations to profile (also BIOMETRICS_PROFILE_OPS)")
+    parser.add_argument("--startup-probe", action="store_true",
+                        help="print start-up timings as JSON and exit once the GUI is ready")
+    args = parser.parse_args(argv)
+
+    if args.profile or os.environ.get("BIOMETRICS_PROFILE"):
+        # The hooks replace module attributes, so they must be installed before
+        # the GUI and the pipeline import the operation functions.
+        import profiling_hooks
+        profiling_hooks.install_from_environment(args.profile, args.profile_dir, args.profile_ops)
+
+    from app import MainApp
+    app = MainApp(started=STARTED, startup_probe=args.startup_probe)
     app.run()
 
 
@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('Sprawozdanie_poprawne_biometria_01_igor_rudolf_327310.pdf', '.')],
-    hiddenimports=[],
+    hiddenimports=['numpy', 'bit_depth', 'pipeline', 'thresholding', 'working_buffer', 'matplotlib.figure',
+                   'matplotlib.backends.backend_tkagg'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
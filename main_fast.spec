@@ -0,0 +1,102 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Launch-optimized build: `pyinstaller main_fast.spec` produces dist/main_fast/main.exe.
+# A onedir bundle starts without unpacking an archive to a temp directory, the
+# binaries are not UPX compressed, and unused packages and backends are left out.
+
+
+# window.py imports these lazily by name, so the analysis cannot find them.
+LAZY_IMPORTS = [
+    'numpy',
+    'bit_depth',
+    'pipeline',
+    'thresholding',
+    'working_buffer',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_tkagg',
+]
+
+EXCLUDES = [
+    # Only the Tk and Agg matplotlib backends are used.
+    'matplotlib.backends.backend_webagg',
+    'matplotlib.backends.backend_webagg_core',
+    'matplotlib.backends.backend_nbagg',
+    'matplotlib.backends.backend_qtagg',
+    'matplotlib.backends.backend_qtcairo',
+    'matplotlib.backends.backend_gtk3agg',
+    'matplotlib.backends.backend_gtk4agg',
+    'matplotlib.backends.backend_wxagg',
+    'matplotlib.backends.backend_macosx',
+    'matplotlib.backends.backend_pdf',
+    'matplotlib.backends.backend_pgf',
+    'matplotlib.backends.backend_ps',
+    'matplotlib.backends.backend_svg',
+    'matplotlib.backends.backend_cairo',
+    'tornado',
+    'IPython',
+    'PyQt5',
+    'PyQt6',
+    'PySide2',
+    'PySide6',
+    'wx',
+    'gi',
+    'cairo',
+    # Build and development tooling pulled in through optional imports.
+    'setuptools',
+    'pkg_resources',
+    '_distutils_hack',
+    'yaml',
+    'asyncio',
+    'xmlrpc',
+    'pydoc',
+    'pydoc_data',
+    'lib2to3',
+    # Command line tools that are not part of the GUI.
+    'benchmark',
+    'parity_check',
+    'reference_backend',
+    'startup_benchmark',
+]
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('Sprawozdanie_poprawne_biometria_01_igor_rudolf_327310.pdf', '.')],
+    hiddenimports=LAZY_IMPORTS,
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUDES,
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='main',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='main_fast',
+)
@@ -0,0 +1,166 @@
+import numpy as np
+from PIL import Image
+from bit_depth import working_mode, max_value, to_array, from_array
+
+
+def _van_herk(pixels, size, axis, op, identity):
+    # van Herk/Gil-Werman: split the padded line into blocks of the window
+    # size, scan each block forwards and backwards, and combine one value from
+    # each scan. Three comparisons per pixel whatever the window size.
+    pixels = np.moveaxis(pixels, axis, 0)
+    n = pixels.shape[0]
+    before = size // 2
+    blocks = -(-(n + size - 1) // size)
+    padded = np.full((blocks * size,) + pixels.shape[1:], identity, dtype=pixels.dtype)
+    padded[before:before + n] = pixels
+    padded = padded.reshape((blocks, size) + pixels.shape[1:])
+    # Scanning one in-block position at a time keeps every step a wide array
+    # operation; ufunc.accumulate along the short block axis is much slower.
+    forward = padded.copy()
+    backward = padded.copy()
+    for i in range(1, size):
+        op(forward[:, i - 1], forward[:, i], out=forward[:, i])
+        op(backward[:, size - i], backward[:, size - 1 - i], out=backward[:, size - 1 - i])
+    forward = forward.reshape((-1,) + pixels.shape[1:])
+    backward = backward.reshape((-1,) + pixels.shape[1:])
+    return np.moveaxis(op(backward[:n], forward[size - 1:size - 1 + n]), 0, axis)
+
+
+def _shift_bits(bits, shift, fill):
+    # Bit-packed rows moved so that bit x of the result is bit x + shift of the
+    # input; bits from outside the row read as fill.
+    quotient, remainder = divmod(shift, 8)
+    margin = abs(quotient) + 1
+    h, nbytes = bits.shape
+    extended = np.full((h, nbytes + 2 * margin), 255 if fill else 0, dtype=np.uint8)
+    extended[:, margin:margin + nbytes] = bits
+    base = extended[:, margin + quotient:margin + quotient + nbytes]
+    if remainder == 0:
+        return base.copy()
+    following = extended[:, margin + quotient + 1:margin + quotient + 1 + nbytes]
+    return (base << remainder) | (following >> (8 - remainder))
+
+
+def _packed_rows(bits, width, size, op, fill):
+    # Along the packed axis a window of any length is covered by two runs whose
+    # length doubles each step, so the cost grows with log(size) on 1/8 of the data.
+    tail = width % 8
+    mask = np.uint8(0xFF >> tail)
+    if tail:
+        # Bits past the image edge in the last byte must not change the result of op.
+        bits = bits.copy()
+        bits[:, -1] = bits[:, -1] | mask if fill else bits[:, -1] & ~mask
+    # Runs that start before the image must still cover its first pixels, so
+    # the row is extended on the left with identity bytes and every shift is forward.
+    lead = size // 16 + 1
+    run = np.full((bits.shape[0], lead + bits.shape[1]), 255 if fill else 0, dtype=np.uint8)
+    run[:, lead:] = bits
+    span = 1
+    while span * 2 <= size:
+        run = op(run, _shift_bits(run, span, fill))
+        span *= 2
+    start = 8 * lead - size // 2
+    result = op(_shift_bits(run, start, fill), _shift_bits(run, start + size - span, fill))[:, :bits.shape[1]]
+    if tail:
+        result[:, -1] &= ~mask
+    return result
+
+
+def is_binary(pixels: np.ndarray) -> bool:
+    return pixels.dtype == np.uint8 and pixels.ndim == 2 and bool(((pixels == 0) | (pixels == 255)).all())
+
+
+def pack(pixels: np.ndarray) -> np.ndarray:
+    # One bit per pixel, eight pixels per byte along each row.
+    return np.packbits(pixels > 0, axis=1)
+
+
+def unpack(bits: np.ndarray, width: int) -> np.ndarray:
+    return np.unpackbits(bits, axis=1, count=width) * np.uint8(255)
+
+
+def _binary_filter(bits, width, size, op, fill):
+    bits = _van_herk(bits, size[1], 0, op, 255 if fill else 0)
+    return _packed_rows(bits, width, size[0], op, fill)
+
+
+def _filter(img: Image.Image, size, binary_op, gray_op, erosion):
+    width, height = size
+    if width < 1 or height < 1:
+        raise ValueError("Structuring element must be at least 1x1")
+    mode = working_mode(img)
+    pixels = to_array(img)
+    if is_binary(pixels):
+        # Binarized images are processed eight pixels per byte.
+        bits = _binary_filter(pack(pixels), pixels.shape[1], size, binary_op, erosion)
+        return Image.fromarray(unpack(bits, pixels.shape[1]))
+    # Pixels beyond the border never win, which matches clamp-to-edge padding.
+    identity = max_value(mode) if erosion else 0
+    if mode == "F":
+        identity = np.inf if erosion else -np.inf
+    pixels = _van_herk(pixels, height, 0, gray_op, identity)
+    return from_array(_van_herk(pixels, width, 1, gray_op, identity), mode)
+
+
+def _size(width, height):
+    return int(width), int(width if height is None else height)
+
+
+def erode(img: Image.Image, width=3, height=None) -> Image.Image:
+    return _filter(img, _size(width, height), np.bitwise_and, np.minimum, True)
+
+
+def dilate(img: Image.Image, width=3, height=None) -> Image.Image:
+    return _filter(img, _size(width, height), np.bitwise_or, np.maximum, False)
+
+
+def opening(img: Image.Image, width=3, height=None) -> Image.Image:
+    return dilate(erode(img, width, height), width, height)
+
+
+def closing(img: Image.Image, width=3, height=None) -> Image.Image:
+    return erode(dilate(img, width, height), width, height)
+
+
+def _thinning_tables():
+    # Zhang-Suen deletion rules for both sub-iterations, indexed by the eight
+    # neighbours P2..P9 (clockwise from north) packed into one byte.
+    first = np.zeros(256, dtype=bool)
+    second = np.zeros(256, dtype=bool)
+    for code in range(256):
+        p = [(code >> i) & 1 for i in range(8)]
+        count = sum(p)
+        transitions = sum(p[i] == 0 and p[(i + 1) % 8] == 1 for i in range(8))
+        if 2 <= count <= 6 and transitions == 1:
+            p2, p4, p6, p8 = p[0], p[2], p[4], p[6]
+            first[code] = p2 * p4 * p6 == 0 and p4 * p6 * p8 == 0
+            second[code] = p2 * p4 * p8 == 0 and p2 * p6 * p8 == 0
+    return first, second
+
+
+THINNING_TABLES = _thinning_tables()
+NEIGHBOURS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def skeletonize(img: Image.Image) -> Image.Image:
+    pixels = to_array(img)
+    if pixels.ndim == 3:
+        pixels = to_array(img.convert("L"))
+    mask = pixels > (max_value(working_mode(img)) // 2 if working_mode(img) != "F" else 0.5)
+    h, w = mask.shape
+    padded = np.zeros((h + 2, w + 2), dtype=bool)
+    padded[1:-1, 1:-1] = mask
+    code = np.empty((h, w), dtype=np.uint8)
+    changed = True
+    while changed:
+        changed = False
+        for table in THINNING_TABLES:
+            code.fill(0)
+            for bit, (dy, dx) in enumerate(NEIGHBOURS):
+                code |= padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w].view(np.uint8) << bit
+            centre = padded[1:-1, 1:-1]
+            remove = centre & table[code]
+            if remove.any():
+                centre &= ~remove
+                changed = True
+    return Image.fromarray(padded[1:-1, 1:-1].view(np.uint8) * np.uint8(255))
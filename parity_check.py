@@ -0,0 +1,180 @@
+import argparse
+import random
+import sys
+import numpy as np
+from PIL import Image
+import reference_backend
+from reference_backend import ReferenceImageProcessor
+from image_processing import ImageProcessor
+from graphics_filter import apply_gaussian_filter, apply_sharpening_filter, apply_averaging_filter
+from edge_detection import (roberts_cross_own_working_way, sobel_operator_own_working_way,
+                            scharr_operator_own_working_way, laplace_operator_own_working_way)
+from pipeline import Pipeline
+from working_buffer import WorkingBuffer
+
+REFERENCE = {
+    "grayscale": ReferenceImageProcessor.to_grayscale,
+    "negative": ReferenceImageProcessor.to_negative,
+    "brightness": ReferenceImageProcessor.adjust_brightness,
+    "contrast": ReferenceImageProcessor.adjust_contrast,
+    "binarize": ReferenceImageProcessor.binarize,
+    "gaussian": reference_backend.apply_gaussian_filter,
+    "sharpening": reference_backend.apply_sharpening_filter,
+    "averaging": reference_backend.apply_averaging_filter,
+    "roberts": reference_backend.roberts_cross_own_working_way,
+    "sobel": reference_backend.sobel_operator_own_working_way,
+    "scharr": reference_backend.scharr_operator_own_working_way,
+    "laplace": reference_backend.laplace_operator_own_working_way,
+}
+
+VECTORIZED = {
+    "grayscale": ImageProcessor.to_grayscale,
+    "negative": ImageProcessor.to_negative,
+    "brightness": ImageProcessor.adjust_brightness,
+    "contrast": ImageProcessor.adjust_contrast,
+    "binarize": ImageProcessor.binarize,
+    "gaussian": apply_gaussian_filter,
+    "sharpening": apply_sharpening_filter,
+    "averaging": apply_averaging_filter,
+    "roberts": roberts_cross_own_working_way,
+    "sobel": sobel_operator_own_working_way,
+    "scharr": scharr_operator_own_working_way,
+    "laplace": laplace_operator_own_working_way,
+}
+
+EDGE_OPERATIONS = ("roberts", "sobel", "scharr", "laplace")
+
+# The reference converts grey images to RGB and back with a float sum that
+# drops some levels by one, which flips binarize pixels just above the threshold.
+RGB_INPUT_ONLY = ("binarize",)
+
+
+def _vectorized(name, image, params):
+    return VECTORIZED[name](image, *params.values())
+
+
+def _pipeline(name, image, params):
+    return Pipeline(image).then(name, **params).evaluate()
+
+
+def _float32(name, image, params):
+    return WorkingBuffer(image).apply(name, **params).to_image()
+
+
+class Backend:
+    def __init__(self, run, tolerance=1, gray_input_only=()):
+        self.run = run
+        self.tolerance = tolerance
+        # Operations that are only comparable on single-channel input, because
+        # the backend converts RGB to gray without PIL's rounding.
+        self.gray_input_only = gray_input_only
+
+
+BACKENDS = {
+    "vectorized": Backend(_vectorized),
+    "pipeline": Backend(_pipeline),
+    "float32": Backend(_float32, gray_input_only=EDGE_OPERATIONS + ("binarize",)),
+}
+
+
+def random_image(rng, mode):
+    width = rng.randint(3, 48)
+    height = rng.randint(3, 48)
+    channels = 3 if mode == "RGB" else 1
+    data = bytes(rng.getrandbits(8) for _ in range(width * height * channels))
+    return Image.frombytes(mode, (width, height), data)
+
+
+def random_weights(rng, size):
+    return [[rng.randint(-10, 10) for _ in range(size)] for _ in range(size)]
+
+
+def random_params(rng, name):
+    if name == "brightness" or name == "contrast":
+        return {"factor": round(rng.uniform(0.0, 2.5), 2)}
+    if name == "binarize":
+        return {"threshold": rng.randint(0, 255)}
+    if name == "gaussian":
+        return {"kernel_size": rng.choice((1, 3, 5, 7, 9)), "sigma": round(rng.uniform(0.5, 5.0), 1)}
+    if name == "sharpening":
+        return {"kernel_size": rng.choice((1, 3, 5, 7)), "intensity": round(rng.uniform(0.0, 5.0), 1)}
+    if name == "averaging":
+        return {"kernel_size": rng.choice((1, 3, 5, 7, 9))}
+    if name in EDGE_OPERATIONS:
+        if rng.random() < 0.5:
+            return {"weight_matrix": None}
+        return {"weight_matrix": random_weights(rng, 2 if name == "roberts" else 3)}
+    return {}
+
+
+def max_difference(expected, actual):
+    # The reference answers in RGB; single-channel results are compared with
+    # their grey repeated in all three channels.
+    if expected.mode == "RGB" and actual.mode == "L":
+        actual = actual.convert("RGB")
+    if expected.mode != actual.mode or expected.size != actual.size:
+        return None
+    return int(np.abs(np.asarray(expected, dtype=np.int32) - np.asarray(actual, dtype=np.int32)).max())
+
+
+def run_parity(backend_names, cases, seed, operations=None):
+    rng = random.Random(seed)
+    report = {}
+    for name in operations or REFERENCE:
+        for case in range(cases):
+            mode = "RGB" if name in RGB_INPUT_ONLY else rng.choice(("L", "RGB"))
+            image = random_image(rng, mode)
+            params = random_params(rng, name)
+            expected = REFERENCE[name](image.convert("RGB"), *params.values())
+
+            for backend_name in backend_names:
+                backend = BACKENDS[backend_name]
+                if mode != "L" and name in backend.gray_input_only:
+                    continue
+                entry = report.setdefault((backend_name, name), {
+                    "cases": 0, "max_difference": 0, "tolerance": backend.tolerance, "failures": []})
+                entry["cases"] += 1
+                difference = max_difference(expected, backend.run(name, image, params))
+                if difference is None or difference > backend.tolerance:
+                    entry["failures"].append({"mode": mode, "size": image.size, "params": params,
+                                              "difference": difference})
+                if difference is None:
+                    entry["max_difference"] = None
+                elif entry["max_difference"] is not None:
+                    entry["max_difference"] = max(entry["max_difference"], difference)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the accelerated backends with the per-pixel reference implementations.")
+    parser.add_argument("--cases", type=int, default=20, help="random cases per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--only", help="comma separated operation names")
+    args = parser.parse_args(argv)
+
+    backend_names = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = [name for name in backend_names if name not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+    operations = [name.strip() for name in args.only.split(",")] if args.only else None
+
+    report = run_parity(backend_names, args.cases, args.seed, operations)
+
+    failed = False
+    print(f"{'backend':<12} {'operation':<12} {'cases':>5} {'max diff':>8} {'tolerance':>9}  status")
+    for (backend_name, name), entry in sorted(report.items()):
+        ok = not entry["failures"]
+        failed = failed or not ok
+        difference = "mode" if entry["max_difference"] is None else entry["max_difference"]
+        print(f"{backend_name:<12} {name:<12} {entry['cases']:>5} {difference:>8} {entry['tolerance']:>9}  "
+              f"{'ok' if ok else 'FAIL'}")
+        for failure in entry["failures"][:3]:
+            print(f"    {failure}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
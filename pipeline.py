@@ -0,0 +1,247 @@
+import argparse
+import ast
+import json
+from PIL import Image
+from bit_depth import is_high_bit_depth
+from image_processing import ImageProcessor
+from graphics_filter import (apply_gaussian_filter, apply_sharpening_filter, apply_averaging_filter,
+                             apply_median_filter, apply_bilateral_filter)
+from edge_detection import (roberts_cross_own_working_way, sobel_operator_own_working_way,
+                            scharr_operator_own_working_way, laplace_operator_own_working_way, canny_edge_detector)
+from thresholding import auto_binarize, adaptive_binarize
+from morphology import erode, dilate, opening, closing, skeletonize
+from equalization import equalize_histogram, clahe
+from pyramid import pyramid_level, pyramid_edges, scale_space_edges
+
+
+class Operation:
+    def __init__(self, func, params=(), defaults=None, lut=None, gray_input=False):
+        self.func = func
+        self.params = params
+        self.defaults = defaults or {}
+        self.lut = lut
+        self.gray_input = gray_input
+
+
+def _negative_lut():
+    return lambda v: 255 - v
+
+
+def _brightness_lut(factor):
+    return lambda v: min(255, max(0, int(v * factor)))
+
+
+def _contrast_lut(factor):
+    return lambda v: max(0, min(255, int(128 + factor * (v - 128))))
+
+
+OPERATIONS = {
+    "grayscale": Operation(ImageProcessor.to_grayscale),
+    "negative": Operation(ImageProcessor.to_negative, lut=_negative_lut),
+    "brightness": Operation(ImageProcessor.adjust_brightness, ("factor",), lut=_brightness_lut),
+    "contrast": Operation(ImageProcessor.adjust_contrast, ("factor",), lut=_contrast_lut),
+    "equalize": Operation(equalize_histogram, ("bins",), {"bins": None}),
+    "clahe": Operation(clahe, ("tiles", "clip_limit", "bins"), {"tiles": 8, "clip_limit": 2.0, "bins": None}),
+    "binarize": Operation(ImageProcessor.binarize, ("threshold",)),
+    "auto_binarize": Operation(auto_binarize, ("method", "bins"), {"method": "otsu", "bins": 256}),
+    "adaptive_binarize": Operation(adaptive_binarize, ("method", "window", "k", "offset"),
+                                   {"method": "sauvola", "window": 25, "k": None, "offset": 0}),
+    "gaussian": Operation(apply_gaussian_filter, ("kernel_size", "sigma", "method"),
+                          {"kernel_size": None, "method": "dense"}),
+    "sharpening": Operation(apply_sharpening_filter, ("kernel_size", "intensity")),
+    "averaging": Operation(apply_averaging_filter, ("kernel_size",)),
+    "median": Operation(apply_median_filter, ("kernel_size",)),
+    "bilateral": Operation(apply_bilateral_filter, ("sigma_spatial", "sigma_range"), {"sigma_range": 0.1}),
+    "erode": Operation(erode, ("width", "height"), {"width": 3, "height": None}),
+    "dilate": Operation(dilate, ("width", "height"), {"width": 3, "height": None}),
+    "opening": Operation(opening, ("width", "height"), {"width": 3, "height": None}),
+    "closing": Operation(closing, ("width", "height"), {"width": 3, "height": None}),
+    "skeletonize": Operation(skeletonize),
+    "pyramid_level": Operation(pyramid_level, ("level", "sigma"), {"level": 1, "sigma": 1.0}),
+    "roberts": Operation(roberts_cross_own_working_way, ("weight_matrix",), {"weight_matrix": None},
+                         gray_input=True),
+    "sobel": Operation(sobel_operator_own_working_way, ("weight_matrix",), {"weight_matrix": None},
+                       gray_input=True),
+    "scharr": Operation(scharr_operator_own_working_way, ("weight_matrix",), {"weight_matrix": None},
+                        gray_input=True),
+    "laplace": Operation(laplace_operator_own_working_way, ("weight_matrix",), {"weight_matrix": None},
+                         gray_input=True),
+    "canny": Operation(canny_edge_detector, ("sigma", "low", "high", "operator"),
+                       {"sigma": 1.4, "low": 0.1, "high": 0.2, "operator": "sobel"}, gray_input=True),
+    "pyramid_edges": Operation(pyramid_edges, ("operator", "level", "sigma", "upsample"),
+                               {"operator": "sobel", "level": 1, "sigma": 1.0, "upsample": True}, gray_input=True),
+    "scale_space_edges": Operation(scale_space_edges, ("operator", "levels", "sigma"),
+                                   {"operator": "sobel", "levels": 3, "sigma": 1.0}, gray_input=True),
+}
+
+
+def _compose_lut(steps):
+    table = list(range(256))
+    for name, values in steps:
+        func = OPERATIONS[name].lut(*values)
+        table = [func(v) for v in table]
+    return table
+
+
+def _apply_lut_steps(image, *steps):
+    if is_high_bit_depth(image):
+        for name, values in steps:
+            image = OPERATIONS[name].func(image, *values)
+        return image
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    return image.point(_compose_lut(steps) * len(image.getbands()))
+
+
+def _grayscale_then(edge_name):
+    # The single-channel intermediate is handed straight to the edge detector
+    # instead of being cached and hashed as a pipeline result of its own.
+    edge = OPERATIONS[edge_name]
+
+    def run(image, *values):
+        return edge.func(ImageProcessor.to_grayscale(image), *values)
+
+    return run
+
+
+class Pipeline:
+    def __init__(self, source=None, parent=None, step=None):
+        self.source = source
+        self.parent = parent
+        self.step = step
+        self._result = None
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    @classmethod
+    def from_spec(cls, source, spec):
+        pipeline = source if isinstance(source, Pipeline) else cls(source)
+        for entry in spec:
+            entry = dict(entry)
+            pipeline = pipeline.then(entry.pop("op"), **entry)
+        return pipeline
+
+    def then(self, name, **params):
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+        operation = OPERATIONS[name]
+        unknown = set(params) - set(operation.params)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {name}: {', '.join(sorted(unknown))}")
+
+        values = []
+        for param in operation.params:
+            if param in params:
+                values.append(params[param])
+            elif param in operation.defaults:
+                values.append(operation.defaults[param])
+            else:
+                raise ValueError(f"Missing parameter for {name}: {param}")
+        return Pipeline(parent=self, step=(name, tuple(values)))
+
+    @property
+    def steps(self):
+        steps = []
+        node = self
+        while node.parent is not None:
+            steps.append(node.step)
+            node = node.parent
+        return steps[::-1]
+
+    def plan(self, steps=None):
+        if steps is None:
+            steps = self.steps
+        stages = []
+        i = 0
+        while i < len(steps):
+            name, values = steps[i]
+            if OPERATIONS[name].lut is not None:
+                run = [steps[i]]
+                while i + 1 < len(steps) and OPERATIONS[steps[i + 1][0]].lut is not None:
+                    i += 1
+                    run.append(steps[i])
+                stages.append(("lut", _apply_lut_steps, tuple(run)))
+            elif (name == "grayscale" and i + 1 < len(steps)
+                  and OPERATIONS[steps[i + 1][0]].gray_input):
+                i += 1
+                edge_name, edge_values = steps[i]
+                stages.append((f"grayscale+{edge_name}", _grayscale_then(edge_name), edge_values))
+            else:
+                stages.append((name, OPERATIONS[name].func, values))
+            i += 1
+        return stages
+
+    def evaluate(self, cache=None):
+        if self._result is not None:
+            return self._result
+
+        pending = []
+        node = self
+        while node._result is None and node.parent is not None:
+            pending.append(node.step)
+            node = node.parent
+
+        if node._result is not None:
+            image = node._result
+        else:
+            image = node._load_source()
+
+        for stage_name, func, values in self.plan(pending[::-1]):
+            if cache is not None:
+                image = cache.run(stage_name, func, image, *values)
+            else:
+                image = func(image, *values)
+
+        self._result = image
+        return image
+
+    def save(self, path, cache=None, **kwargs):
+        self.evaluate(cache).save(path, **kwargs)
+
+    def _load_source(self):
+        if isinstance(self.source, Image.Image):
+            self._result = self.source
+        else:
+            image = Image.open(self.source)
+            image.load()
+            self._result = image
+        return self._result
+
+
+def parse_step(text):
+    name, _, arguments = text.partition(":")
+    params = {}
+    if arguments.strip():
+        # Parsed as a call so that commas inside list values, such as a
+        # weight_matrix, do not split parameters.
+        try:
+            call = ast.parse(f"f({arguments})", mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Cannot parse parameters of {name.strip()}: {arguments}") from e
+        if call.args or any(keyword.arg is None for keyword in call.keywords):
+            raise ValueError(f"Parameters of {name.strip()} must be written as name=value")
+        for keyword in call.keywords:
+            params[keyword.arg] = ast.literal_eval(keyword.value)
+    return {"op": name.strip(), **params}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a sequence of operations on an image without the GUI.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("steps", nargs="*", help="operation steps, e.g. gaussian:kernel_size=5,sigma=1.5 sobel")
+    parser.add_argument("--spec", help="JSON file with a list of {\"op\": name, ...params} steps")
+    args = parser.parse_args(argv)
+
+    spec = [parse_step(step) for step in args.steps]
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f) + spec
+
+    Pipeline.from_spec(Pipeline.open(args.input), spec).save(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+import argparse
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from PIL import Image
+from benchmark import percentile
+from pipeline import Pipeline, OPERATIONS
+from graphics_filter import gaussian_kernel_size
+from result_cache import ResultCache
+
+OUTPUT_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "tiff": ("TIFF", "image/tiff"),
+    "bmp": ("BMP", "image/bmp"),
+}
+
+# Inclusive ranges for size-like parameters, so that no single parameter asks
+# for an absurd amount of memory. None (the default for several) is accepted.
+# The time a request takes is bounded separately, by estimate_work().
+PARAMETER_LIMITS = {
+    "kernel_size": (1, 51),
+    "sigma": (0, 100),
+    "sigma_spatial": (1, 100),
+    "sigma_range": (0.01, 1),
+    "clip_limit": (1, 100),
+    "window": (3, 201),
+    "width": (1, 101),
+    "height": (1, 101),
+    "tiles": (1, 64),
+    "bins": (2, 65536),
+    "level": (0, 8),
+    "levels": (1, 8),
+}
+
+# CLAHE builds one float32 lookup table of `bins` entries per tile.
+MAX_LUT_ENTRIES = 2 ** 24
+# The largest bin count CLAHE picks by itself, for 16-bit and float images.
+DEFAULT_CLAHE_BINS = 4096
+
+_worker_cache = None
+
+
+def _init_worker(cache_bytes, max_pixels):
+    global _worker_cache
+    _worker_cache = ResultCache(max_bytes=cache_bytes) if cache_bytes else None
+    Image.MAX_IMAGE_PIXELS = max_pixels
+
+
+def process_job(data, spec, output_format):
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    result = Pipeline.from_spec(image, spec).evaluate(_worker_cache)
+    buffer = io.BytesIO()
+    result.save(buffer, format=OUTPUT_FORMATS[output_format][0])
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+def _check_limit(name, value, limits):
+    low, high = limits[name]
+    values = value if isinstance(value, (list, tuple)) else [value]
+    for item in values:
+        if isinstance(item, bool) or not isinstance(item, (int, float)):
+            raise ValueError(f"{name} must be a number")
+        if not low <= item <= high:
+            raise ValueError(f"{name} must be between {low} and {high}, got {item}")
+
+
+def _lut_entries(entry):
+    tiles = entry.get("tiles", OPERATIONS["clahe"].defaults["tiles"])
+    tiles_y, tiles_x = (tiles, tiles) if isinstance(tiles, int) else tiles
+    return tiles_y * tiles_x * (entry.get("bins") or DEFAULT_CLAHE_BINS)
+
+
+def step_work(entry):
+    # Rough operations per pixel and channel of one step. Only the operations
+    # whose cost grows with a parameter are modelled; the rest cost about the same.
+    params = {**OPERATIONS[entry["op"]].defaults, **entry}
+    op = params["op"]
+    if op == "gaussian":
+        if params["method"] == "recursive":
+            return 20
+        return 2 * (params["kernel_size"] or gaussian_kernel_size(params["sigma"]))
+    if op == "averaging":
+        return 2 * params["kernel_size"]
+    if op in ("sharpening", "median"):
+        return params["kernel_size"] ** 2
+    if op == "bilateral":
+        # Grid cells per pixel, each blurred along three axes.
+        return 20 + 30 / (params["sigma_range"] * params["sigma_spatial"] ** 2)
+    if op == "canny":
+        return 40 + 2 * gaussian_kernel_size(params["sigma"])
+    return 10
+
+
+def estimate_work(spec, samples):
+    return samples * sum(step_work(entry) for entry in spec)
+
+
+def validate_spec(spec, max_steps, limits=PARAMETER_LIMITS):
+    if not isinstance(spec, list) or not spec:
+        raise ValueError("spec must be a non-empty list of steps")
+    if len(spec) > max_steps:
+        raise ValueError(f"spec has {len(spec)} steps, the limit is {max_steps}")
+    for entry in spec:
+        if not isinstance(entry, dict) or "op" not in entry:
+            raise ValueError("every step must be an object with an 'op' key")
+        if not isinstance(entry["op"], str):
+            raise ValueError("'op' must be a string")
+        for name, value in entry.items():
+            if name in limits and value is not None:
+                _check_limit(name, value, limits)
+        if entry["op"] == "clahe" and _lut_entries(entry) > MAX_LUT_ENTRIES:
+            raise ValueError(f"tiles and bins ask for {_lut_entries(entry)} lookup table entries, "
+                             f"the limit is {MAX_LUT_ENTRIES}")
+    # Checks operation and parameter names without touching any pixels.
+    Pipeline.from_spec(None, spec)
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    def __init__(self, spec, output_format):
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.output_format = output_format
+        self.future = None
+        self.created = time.time()
+        self.finished = None
+        self.compute_s = None
+        self.result = None
+        self.error = None
+
+    @property
+    def status(self):
+        if self.finished is not None:
+            return "failed" if self.error is not None else "done"
+        return "running" if self.future.running() else "queued"
+
+    def describe(self):
+        description = {"id": self.id, "status": self.status, "steps": len(self.spec),
+                       "format": self.output_format, "created": self.created}
+        if self.finished is not None:
+            description["latency_s"] = self.finished - self.created
+            description["compute_s"] = self.compute_s
+        if self.error is not None:
+            description["error"] = self.error
+        return description
+
+
+class ProcessingService:
+    def __init__(self, workers=None, max_body_bytes=64 * 2 ** 20, max_pixels=50_000_000, max_queue=64,
+                 max_steps=32, keep_results=256, cache_bytes=64 * 2 ** 20, stats_window=60.0,
+                 parameter_limits=None, max_work=2e10):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body_bytes = max_body_bytes
+        self.max_pixels = max_pixels
+        self.max_queue = max_queue
+        self.max_steps = max_steps
+        self.parameter_limits = parameter_limits or PARAMETER_LIMITS
+        self.max_work = max_work
+        self.keep_results = keep_results
+        self.stats_window = stats_window
+        self.cache_bytes = cache_bytes
+        self.executor = self._new_executor()
+        self.jobs = OrderedDict()
+        self.started = time.time()
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self.latencies = deque(maxlen=1000)
+        self.compute_times = deque(maxlen=1000)
+        self.completions = deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        # Worker processes live as long as the service, so the interpreter start
+        # and imports are paid once, and each keeps its own result cache.
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                   initargs=(self.cache_bytes, self.max_pixels))
+
+    def submit(self, data, spec, output_format="png"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ServiceError(400, f"format must be one of: {', '.join(OUTPUT_FORMATS)}")
+        samples = self._check_image(data)
+        try:
+            validate_spec(spec, self.max_steps, self.parameter_limits)
+            work = estimate_work(spec, samples)
+        except (TypeError, ValueError) as e:
+            raise ServiceError(400, str(e))
+        if work > self.max_work:
+            raise ServiceError(413, f"the spec needs about {work:.3g} operations on this image, "
+                                    f"the limit is {self.max_work:.3g}")
+
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise ServiceError(503, f"queue is full ({self.max_queue} jobs)")
+            self._pending += 1
+            self.counters["submitted"] += 1
+            job = Job(spec, output_format)
+            try:
+                job.future = self.executor.submit(process_job, data, spec, output_format)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); its jobs have failed, start a fresh pool.
+                self.executor = self._new_executor()
+                job.future = self.executor.submit(process_job, data, spec, output_format)
+            self.jobs[job.id] = job
+        job.future.add_done_callback(lambda future: self._finish(job))
+        return job
+
+    def _check_image(self, data):
+        try:
+            # Only reads the header; the pixels are decoded by the worker.
+            image = Image.open(io.BytesIO(data))
+        except Exception as e:
+            raise ServiceError(400, f"cannot read image: {e}")
+        width, height = image.size
+        if width * height > self.max_pixels:
+            raise ServiceError(413, f"image has {width * height} pixels, the limit is {self.max_pixels}")
+        return width * height * len(image.getbands())
+
+    def _finish(self, job):
+        try:
+            job.result, job.compute_s = job.future.result()
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+        job.finished = time.time()
+
+        with self._lock:
+            self._pending -= 1
+            if job.error is None:
+                self.counters["completed"] += 1
+                self.latencies.append(job.finished - job.created)
+                self.compute_times.append(job.compute_s)
+                self.completions.append(job.finished)
+            else:
+                self.counters["failed"] += 1
+            self._evict_finished()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.keep_results)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(404, f"unknown job: {job_id}")
+        return job
+
+    def wait(self, job, timeout):
+        wait([job.future], timeout=timeout)
+        # The done callback may still be running right after the future resolves.
+        deadline = time.time() + 1.0
+        while job.finished is None and job.future.done() and time.time() < deadline:
+            time.sleep(0.001)
+        return job.finished is not None
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            while self.completions and self.completions[0] < now - self.stats_window:
+                self.completions.popleft()
+            window = min(self.stats_window, max(now - self.started, 1e-9))
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "uptime_s": now - self.started,
+                "workers": self.workers,
+                "pending": self._pending,
+                **self.counters,
+                "jobs": statuses,
+                "throughput_jobs_s": len(self.completions) / window,
+                "latency_ms": _distribution(self.latencies),
+                "compute_ms": _distribution(self.compute_times),
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _distribution(values):
+    if not values:
+        return None
+    values = list(values)
+    return {"p50": percentile(values, 0.5) * 1000, "p95": percentile(values, 0.95) * 1000,
+            "max": max(values) * 1000, "count": len(values)}
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "BiometricsProcessing/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def _dispatch(self, handler):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            handler(parts, query)
+        except ServiceError as e:
+            self._send_json(e.status, {"error": str(e)})
+
+    def _get(self, parts, query):
+        if parts == ["stats"]:
+            self._send_json(200, self.service.stats())
+        elif parts == ["operations"]:
+            self._send_json(200, {name: {"params": list(operation.params), "defaults": operation.defaults}
+                                  for name, operation in OPERATIONS.items()})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            self._send_json(200, self.service.get(parts[1]).describe())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            self._send_result(self.service.get(parts[1]))
+        else:
+            raise ServiceError(404, f"no such endpoint: {self.path}")
+
+    def _post(self, parts, query):
+        if parts != ["jobs"]:
+            raise ServiceError(404, f"no such endpoint: {self.path}")
+        spec_text = query.get("spec") or self.headers.get("X-Pipeline-Spec")
+        if not spec_text:
+            raise ServiceError(400, "missing pipeline spec (spec query parameter or X-Pipeline-Spec header)")
+        try:
+            spec = json.loads(spec_text)
+        except json.JSONDecodeError as e:
+            raise ServiceError(400, f"spec is not valid JSON: {e}")
+
+        try:
+            timeout = float(query.get("wait", 0) or 0)
+        except ValueError:
+            raise ServiceError(400, "wait must be a number of seconds")
+
+        job = self.service.submit(self._read_body(), spec, query.get("format", "png").lower())
+        if timeout > 0 and self.service.wait(job, timeout):
+            self._send_result(job)
+        else:
+            self._send_json(202, job.describe(), {"Location": f"/jobs/{job.id}"})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            raise ServiceError(411, "the image must be sent as the request body with a Content-Length")
+        if length > self.service.max_body_bytes:
+            self.close_connection = True
+            raise ServiceError(413, f"request body is {length} bytes, the limit is {self.service.max_body_bytes}")
+        return self.rfile.read(length)
+
+    def _send_result(self, job):
+        if job.finished is None:
+            self._send_json(202, job.describe())
+        elif job.error is not None:
+            self._send_json(500, job.describe())
+        else:
+            self._send(200, job.result, OUTPUT_FORMATS[job.output_format][1], {"X-Job-Id": job.id})
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ProcessingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the image operations over HTTP with a worker pool.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-body-mb", type=float, default=64)
+    parser.add_argument("--max-pixels", type=int, default=50_000_000)
+    parser.add_argument("--max-queue", type=int, default=64, help="queued and running jobs before 503")
+    parser.add_argument("--max-steps", type=int, default=32)
+    parser.add_argument("--keep-results", type=int, default=256, help="finished jobs kept for polling")
+    parser.add_argument("--cache-mb", type=float, default=64, help="result cache per worker (0 disables)")
+    parser.add_argument("--max-work", type=float, default=2e10,
+                        help="estimated operations per job; about 30 s of one core at the default")
+    args = parser.parse_args(argv)
+
+    service = ProcessingService(args.workers, int(args.max_body_mb * 2 ** 20), args.max_pixels, args.max_queue,
+                                args.max_steps, args.keep_results, int(args.cache_mb * 2 ** 20),
+                                max_work=args.max_work)
+    server = ProcessingServer((args.host, args.port), service)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
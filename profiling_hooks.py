@@ -0,0 +1,173 @@
+import atexit
+import cProfile
+import functools
+import inspect
+import os
+import sys
+import threading
+from collections import Counter
+import edge_detection
+import graphics_filter
+from image_processing import ImageProcessor
+
+MODES = ("cprofile", "sample")
+DEFAULT_DIRECTORY = "profiles"
+DEFAULT_INTERVAL = 0.002
+
+
+def parse_modes(text):
+    modes = set()
+    for mode in text.split(","):
+        mode = mode.strip().lower()
+        if not mode:
+            continue
+        if mode == "all":
+            modes.update(MODES)
+        elif mode in MODES:
+            modes.add(mode)
+        else:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of: {', '.join(MODES + ('all',))}")
+    return modes
+
+
+def operation_targets():
+    targets = []
+    for module in (graphics_filter, edge_detection):
+        for name, func in vars(module).items():
+            if inspect.isfunction(func) and func.__module__ == module.__name__ and not name.startswith("_"):
+                targets.append((module, name))
+    for name, attribute in vars(ImageProcessor).items():
+        if isinstance(attribute, staticmethod) and not name.startswith("_"):
+            targets.append((ImageProcessor, name))
+    return targets
+
+
+class OperationHooks:
+    def __init__(self, modes, output_dir=DEFAULT_DIRECTORY, operations=None, interval=DEFAULT_INTERVAL):
+        self.modes = set(modes)
+        self.output_dir = output_dir
+        self.operations = set(operations) if operations else None
+        self.interval = interval
+        self.calls = Counter()
+        self.stacks = Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # cProfile can only follow one call at a time reliably, so calls that
+        # overlap with a profiled one (from another thread) run unprofiled.
+        self._profile_lock = threading.Lock()
+        self._profiles = {}
+        self._active = {}
+        self._installed = []
+        self._stop = threading.Event()
+        self._sampler = None
+        self._wrapper_code = None
+        self._finished = False
+
+    def install(self):
+        for owner, name in operation_targets():
+            if self.operations is not None and name not in self.operations:
+                continue
+            original = vars(owner)[name]
+            func = original.__func__ if isinstance(original, staticmethod) else original
+            wrapper = self._wrap(name, func)
+            setattr(owner, name, staticmethod(wrapper) if isinstance(original, staticmethod) else wrapper)
+            self._installed.append((owner, name, original))
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        if "sample" in self.modes:
+            self._sampler = threading.Thread(target=self._sample, name="operation-sampler", daemon=True)
+            self._sampler.start()
+        atexit.register(self.finish)
+        return self
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._installed):
+            setattr(owner, name, original)
+        self._installed.clear()
+        self.finish()
+
+    def _wrap(self, name, func):
+        @functools.wraps(func)
+        def operation_wrapper(*args, **kwargs):
+            # Operations call each other (binarize calls to_grayscale); only
+            # the outermost call is recorded so its profile covers the rest.
+            if getattr(self._local, "active", False):
+                return func(*args, **kwargs)
+
+            self._local.active = True
+            thread_id = threading.get_ident()
+            self._active[thread_id] = name
+            profile = None
+            if "cprofile" in self.modes and self._profile_lock.acquire(blocking=False):
+                with self._lock:
+                    profile = self._profiles.setdefault(name, cProfile.Profile())
+                profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    profile.dump_stats(self._path(f"{name}.prof"))
+                    self._profile_lock.release()
+                self._active.pop(thread_id, None)
+                self._local.active = False
+                with self._lock:
+                    self.calls[name] += 1
+        # Every wrapper shares this code object; the sampler cuts stacks there.
+        self._wrapper_code = operation_wrapper.__code__
+        return operation_wrapper
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id in active:
+                frame = frames.get(thread_id)
+                stack = []
+                root = None
+                while frame is not None:
+                    code = frame.f_code
+                    if code is self._wrapper_code:
+                        root = len(stack)
+                    else:
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if root is None:
+                    # The operation returned between reading _active and the frames.
+                    continue
+                # Keep the operation's own frame and everything it called.
+                self.stacks[";".join(reversed(stack[:root]))] += 1
+
+    def _path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    def write_stacks(self, path=None):
+        path = path or self._path("stacks.folded")
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self.write_stacks()
+        if self.calls:
+            print(f"Profiled {sum(self.calls.values())} operation calls, results in {os.path.abspath(self.output_dir)}")
+
+
+def install_from_environment(modes=None, output_dir=None, operations=None, environ=os.environ):
+    modes = modes or environ.get("BIOMETRICS_PROFILE")
+    if not modes:
+        return None
+    output_dir = output_dir or environ.get("BIOMETRICS_PROFILE_DIR") or DEFAULT_DIRECTORY
+    operations = operations or environ.get("BIOMETRICS_PROFILE_OPS")
+    if isinstance(operations, str):
+        operations = [name.strip() for name in operations.split(",") if name.strip()]
+    return OperationHooks(parse_modes(modes), output_dir, operations).install()
@@ -1,12 +1,10 @@
 from PIL import Image, ImageDraw
 import numpy as np
+from bit_depth import gray_array
 
 
 def project_image(image, projection_type, normalization_factor, return_projection=False):
-    if image.mode != "L":
-        image = image.convert("L")
-
-    img_array = np.array(image)
+    img_array = gray_array(image)
     height, width = img_array.shape
 
     if projection_type == "Horizontal":
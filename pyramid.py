@@ -0,0 +1,127 @@
+import numpy as np
+from PIL import Image
+from bit_depth import working_mode, gray_mode, gray_array, to_array, from_array
+from fast_kernels import reduce_half, reduce_binomial, expand_double
+from graphics_filter import kernel_of_the_gauss, gaussian_kernel_size
+from edge_detection import (roberts_cross_own_working_way, sobel_operator_own_working_way,
+                            scharr_operator_own_working_way, laplace_operator_own_working_way, canny_edge_detector)
+from morphology import is_binary
+
+EDGE_OPERATORS = {
+    "roberts": roberts_cross_own_working_way,
+    "sobel": sobel_operator_own_working_way,
+    "scharr": scharr_operator_own_working_way,
+    "laplace": laplace_operator_own_working_way,
+    "canny": canny_edge_detector,
+}
+
+
+def _taps(sigma):
+    # The Gaussian is separable; its row sums are the 1D taps.
+    return np.sum(kernel_of_the_gauss(gaussian_kernel_size(sigma), sigma), axis=1)
+
+
+def _reduce(pixels, taps):
+    def reduce(plane):
+        if taps is None:
+            return reduce_binomial(plane)
+        return reduce_half(plane.astype(np.float32, copy=False), taps)
+
+    if pixels.ndim == 2:
+        return reduce(pixels)
+    return np.stack([reduce(np.ascontiguousarray(pixels[..., c])) for c in range(pixels.shape[2])], axis=2)
+
+
+def _expand(pixels, shape):
+    if pixels.ndim == 2:
+        return expand_double(pixels, shape)
+    return np.stack([expand_double(pixels[..., c], shape) for c in range(pixels.shape[2])], axis=2)
+
+
+def _levels(pixels, levels, sigma):
+    # Each level is a quarter of the one before, so the whole pyramid costs
+    # about 4/3 of the first reduction. Levels stop once a side reaches one pixel.
+    if levels < 1:
+        raise ValueError("A pyramid needs at least one level")
+    if sigma <= 0:
+        raise ValueError("Sigma must be positive")
+    # At sigma 1 integer pixels are reduced with the integer binomial taps and
+    # stay integers, which halves the work of the full-size first reduction.
+    taps = None if sigma == 1 and pixels.dtype.kind == "u" else _taps(sigma)
+    result = [pixels]
+    while len(result) < levels and min(result[-1].shape[:2]) > 1:
+        result.append(_reduce(result[-1], taps))
+    return result
+
+
+def gaussian_pyramid(img: Image.Image, levels=4, sigma=1.0) -> list:
+    mode = working_mode(img)
+    return [img] + [from_array(level, mode) for level in _levels(to_array(img), levels, sigma)[1:]]
+
+
+def laplacian_pyramid(img: Image.Image, levels=4, sigma=1.0) -> list:
+    # Band-pass float arrays, finest first; the last entry is the coarsest
+    # Gaussian level, so collapse() restores the image exactly.
+    gaussian = _levels(to_array(img), levels, sigma)
+    bands = [fine - _expand(coarse, fine.shape[:2]) for fine, coarse in zip(gaussian, gaussian[1:])]
+    return bands + [gaussian[-1].astype(np.float32)]
+
+
+def collapse(laplacian: list) -> np.ndarray:
+    pixels = laplacian[-1]
+    for band in reversed(laplacian[:-1]):
+        pixels = band + _expand(pixels, band.shape[:2])
+    return pixels
+
+
+def _level(pixels, level, sigma):
+    levels = _levels(pixels, level + 1, sigma)
+    if len(levels) <= level:
+        raise ValueError(f"The image is too small for pyramid level {level}")
+    return levels
+
+
+def pyramid_level(img: Image.Image, level=1, sigma=1.0) -> Image.Image:
+    # Coarse previews only pay for the reductions down to their own level.
+    return from_array(_level(to_array(img), level, sigma)[level], working_mode(img))
+
+
+def _edge_operator(operator):
+    if operator not in EDGE_OPERATORS:
+        raise ValueError(f"Unknown edge operator '{operator}', expected one of: {', '.join(EDGE_OPERATORS)}")
+    return EDGE_OPERATORS[operator]
+
+
+def _to_full_size(edges, shapes):
+    pixels = to_array(edges)
+    binary = is_binary(pixels)
+    pixels = pixels.astype(np.float32)
+    for shape in reversed(shapes):
+        pixels = expand_double(pixels, shape)
+    if binary:
+        # Canny output stays binary instead of getting interpolated grey ramps.
+        pixels = np.where(pixels >= 128, np.float32(255), np.float32(0))
+    return from_array(pixels, working_mode(edges))
+
+
+def pyramid_edges(img: Image.Image, operator="sobel", level=1, sigma=1.0, upsample=True) -> Image.Image:
+    # Edge operators only look at intensity, so only the grey image is reduced.
+    edge = _edge_operator(operator)
+    gray = _level(gray_array(img), level, sigma)
+    edges = edge(from_array(gray[level], gray_mode(img)))
+    if not upsample:
+        return edges
+    return _to_full_size(edges, [pixels.shape for pixels in gray[:level]])
+
+
+def scale_space_edges(img: Image.Image, operator="sobel", levels=3, sigma=1.0) -> Image.Image:
+    # The strongest response over all levels, each brought back to full size:
+    # fine texture shows at the first level, coarse outlines at the last ones.
+    edge = _edge_operator(operator)
+    gray = _levels(gray_array(img), levels, sigma)
+    shapes = [pixels.shape for pixels in gray]
+    result = None
+    for level, pixels in enumerate(gray):
+        edges = _to_full_size(edge(from_array(pixels, gray_mode(img))), shapes[:level])
+        result = to_array(edges) if result is None else np.maximum(result, to_array(edges))
+    return from_array(result, working_mode(edges))
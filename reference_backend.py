@@ -0,0 +1,333 @@
+# The per-pixel implementations from before any backend was accelerated, copied
+# unchanged. They expect RGB input and always answer in RGB; they are slow but
+# simple enough to check by hand, so they are the ground truth the faster
+# backends are compared against.
+import math
+from PIL import Image
+
+
+class ReferenceImageProcessor:
+    @staticmethod
+    def to_grayscale(img: Image.Image) -> Image.Image:
+        width, height = img.size
+        gray_img = Image.new("RGB", (width, height))
+        pixels = img.load()
+        gray_pixels = gray_img.load()
+        for y in range(height):
+            for x in range(width):
+                r, g, b = pixels[x, y]
+                gray = int(0.299 * r + 0.587 * g + 0.114 * b)
+                gray_pixels[x, y] = (gray, gray, gray)
+        return gray_img
+
+    @staticmethod
+    def to_negative(img: Image.Image) -> Image.Image:
+        width, height = img.size
+        negative_img = Image.new("RGB", (width, height))
+        pixels = img.load()
+        negative_pixels = negative_img.load()
+        for y in range(height):
+            for x in range(width):
+                r, g, b = pixels[x, y]
+                negative_pixels[x, y] = (255 - r, 255 - g, 255 - b)
+        return negative_img
+
+    @staticmethod
+    def adjust_brightness(img: Image.Image, factor: float) -> Image.Image:
+        width, height = img.size
+        result_img = Image.new("RGB", (width, height))
+        pixels = img.load()
+        result_pixels = result_img.load()
+        for y in range(height):
+            for x in range(width):
+                r, g, b = pixels[x, y]
+                r = min(255, max(0, int(r * factor)))
+                g = min(255, max(0, int(g * factor)))
+                b = min(255, max(0, int(b * factor)))
+                result_pixels[x, y] = (r, g, b)
+        return result_img
+
+    @staticmethod
+    def adjust_contrast(img: Image.Image, factor: float) -> Image.Image:
+        width, height = img.size
+        result_img = Image.new("RGB", (width, height))
+        pixels = img.load()
+        result_pixels = result_img.load()
+        for y in range(height):
+            for x in range(width):
+                r, g, b = pixels[x, y]
+                nr = 128 + factor * (r - 128)
+                ng = 128 + factor * (g - 128)
+                nb = 128 + factor * (b - 128)
+                nr = max(0, min(255, int(nr)))
+                ng = max(0, min(255, int(ng)))
+                nb = max(0, min(255, int(nb)))
+                result_pixels[x, y] = (nr, ng, nb)
+        return result_img
+
+    @staticmethod
+    def binarize(img: Image.Image, threshold: int) -> Image.Image:
+        width, height = img.size
+        result_img = Image.new("RGB", (width, height))
+        pixels = img.load()
+        result_pixels = result_img.load()
+        for y in range(height):
+            for x in range(width):
+                r, g, b = pixels[x, y]
+                gray = int(0.299 * r + 0.587 * g + 0.114 * b)
+                if gray > threshold:
+                    result_pixels[x, y] = (255, 255, 255)
+                else:
+                    result_pixels[x, y] = (0, 0, 0)
+        return result_img
+
+
+def kernel_of_the_gauss(kernel_size, sigma):
+    kernel = [[0 for _ in range(kernel_size)] for _ in range(kernel_size)]
+    center = kernel_size // 2
+    sum_val = 0.0
+    for i in range(kernel_size):
+        for j in range(kernel_size):
+            x = i - center
+            y = j - center
+            kernel[i][j] = math.exp(-(x * x + y * y) / (2 * sigma * sigma))
+            sum_val += kernel[i][j]
+    for i in range(kernel_size):
+        for j in range(kernel_size):
+            kernel[i][j] /= sum_val
+    return kernel
+
+
+def sharpening_kernel(kernel_size, intensity):
+    tot = kernel_size * kernel_size
+    avg = 1.0 / tot
+    ker = []
+    for i in range(kernel_size):
+        row = []
+        for j in range(kernel_size):
+            row.append(-intensity * avg)
+        ker.append(row)
+    mid = kernel_size // 2
+    ker[mid][mid] = 1 + intensity - intensity * avg
+    return ker
+
+
+def apply_averaging_filter(img, k_size):
+    img = img.convert("RGB")
+    w, h = img.size
+    new_img = img.copy()
+    pix = img.load()
+    new_pix = new_img.load()
+
+    val = 1.0 / (k_size * k_size)
+    kernel = [[val for _ in range(k_size)] for _ in range(k_size)]
+
+    off = k_size // 2
+
+    for y in range(h):
+        for x in range(w):
+            r_sum = 0.0
+            g_sum = 0.0
+            b_sum = 0.0
+
+            for j in range(-off, off + 1):
+                for i in range(-off, off + 1):
+                    xi = min(max(x + i, 0), w - 1)
+                    yj = min(max(y + j, 0), h - 1)
+                    r, g, b = pix[xi, yj]
+                    weight = kernel[j + off][i + off]
+                    r_sum += r * weight
+                    g_sum += g * weight
+                    b_sum += b * weight
+            new_pix[x, y] = (int(r_sum), int(g_sum), int(b_sum))
+
+    return new_img
+
+
+def apply_sharpening_filter(img, k_size, inten):
+    img = img.convert("RGB")
+    w, h = img.size
+    new_img = Image.new("RGB", (w, h))
+    pix = img.load()
+    new_pix = new_img.load()
+
+    ker = sharpening_kernel(k_size, inten)
+    mid = k_size // 2
+
+    for y in range(h):
+        for x in range(w):
+            sum_r = 0.0
+            sum_g = 0.0
+            sum_b = 0.0
+
+            for j in range(-mid, mid + 1):
+                for i in range(-mid, mid + 1):
+                    xi = min(max(x + i, 0), w - 1)
+                    yj = min(max(y + j, 0), h - 1)
+                    r, g, b = pix[xi, yj]
+                    weight = ker[j + mid][i + mid]
+                    sum_r += r * weight
+                    sum_g += g * weight
+                    sum_b += b * weight
+
+            new_r = min(255, max(0, int(sum_r)))
+            new_g = min(255, max(0, int(sum_g)))
+            new_b = min(255, max(0, int(sum_b)))
+            new_pix[x, y] = (new_r, new_g, new_b)
+
+    return new_img
+
+
+def apply_gaussian_filter(image, kernel_size, sigma):
+    image = image.convert("RGB")
+    width, height = image.size
+    result_img = Image.new("RGB", (width, height))
+    pixels = image.load()
+    result_pixels = result_img.load()
+
+    kernel = kernel_of_the_gauss(kernel_size, sigma)
+    offset = kernel_size // 2
+
+    for y in range(height):
+        for x in range(width):
+            r_acc = 0.0
+            g_acc = 0.0
+            b_acc = 0.0
+            for ky in range(-offset, offset + 1):
+                for kx in range(-offset, offset + 1):
+                    px = min(max(x + kx, 0), width - 1)
+                    py = min(max(y + ky, 0), height - 1)
+                    r, g, b = pixels[px, py]
+                    weight = kernel[ky + offset][kx + offset]
+                    r_acc += r * weight
+                    g_acc += g * weight
+                    b_acc += b * weight
+            result_pixels[x, y] = (int(r_acc), int(g_acc), int(b_acc))
+    return result_img
+
+
+def roberts_cross_own_working_way(img, weight_matrix=None):
+
+    if weight_matrix is None:
+        weight_matrix = [[1, 0], [0, -1]]
+    if len(weight_matrix) != 2 or any(len(row) != 2 for row in weight_matrix):
+        raise ValueError("Weights matrix must be 2x2.")
+    gray = img.convert("L")
+    width, height = gray.size
+    new_img = Image.new("L", (width, height))
+    src = gray.load()
+    dst = new_img.load()
+
+    second_matrix = [
+        [weight_matrix[0][1], -weight_matrix[0][0]],
+        [-weight_matrix[1][1], weight_matrix[1][0]]
+    ]
+
+    for y in range(height - 1):
+        for x in range(width - 1):
+            gx = (weight_matrix[0][0] * src[x, y] +
+                  weight_matrix[0][1] * src[x + 1, y] +
+                  weight_matrix[1][0] * src[x, y + 1] +
+                  weight_matrix[1][1] * src[x + 1, y + 1])
+            gy = (second_matrix[0][0] * src[x, y] +
+                  second_matrix[0][1] * src[x + 1, y] +
+                  second_matrix[1][0] * src[x, y + 1] +
+                  second_matrix[1][1] * src[x + 1, y + 1])
+            magnitude = math.sqrt(gx * gx + gy * gy)
+            dst[x, y] = min(255, int(magnitude))
+
+    for y in range(height):
+        dst[width - 1, y] = 0
+    for x in range(width):
+        dst[x, height - 1] = 0
+
+    return new_img.convert("RGB")
+
+
+def sobel_operator_own_working_way(img, weight_matrix=None):
+    if weight_matrix is None:
+        weight_matrix = [[-1, 0, 1],
+                         [-2, 0, 2],
+                         [-1, 0, 1]]
+    if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
+        raise ValueError("Weight matrix must be 3x3")
+    second_matrix = [list(row) for row in zip(*weight_matrix[::-1])]
+    gray = img.convert("L")
+    width, height = gray.size
+    new_img = Image.new("L", (width, height))
+    src = gray.load()
+    dst = new_img.load()
+
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            gx = 0.0
+            gy = 0.0
+            for j in range(-1, 2):
+                for i in range(-1, 2):
+                    pixel = src[x + i, y + j]
+                    gx += pixel * weight_matrix[j + 1][i + 1]
+                    gy += pixel * second_matrix[j + 1][i + 1]
+            g = int(math.sqrt(gx * gx + gy * gy))
+            if g > 255:
+                g = 255
+            dst[x, y] = g
+
+    return new_img.convert("RGB")
+
+
+def laplace_operator_own_working_way(img, weight_matrix=None):
+    if weight_matrix is None:
+        weight_matrix = [[0, -1, 0],
+                         [-1, 4, -1],
+                         [0, -1, 0]]
+    if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
+        raise ValueError("Weights matrix must be 3x3.")
+    gray = img.convert("L")
+    w, h = gray.size
+    new_img = Image.new("L", (w, h))
+    src = gray.load()
+    dst = new_img.load()
+
+    for y in range(1, h - 1):
+        for x in range(1, w - 1):
+            acc = 0.0
+            for j in range(-1, 2):
+                for i in range(-1, 2):
+                    acc += src[x + i, y + j] * weight_matrix[j + 1][i + 1]
+            acc = abs(acc)
+            if acc > 255:
+                acc = 255
+            dst[x, y] = int(acc)
+
+    return new_img.convert("RGB")
+
+
+def scharr_operator_own_working_way(img, weight_matrix=None):
+    if weight_matrix is None:
+        weight_matrix = [[-3, 0, 3],
+                         [-10, 0, 10],
+                         [-3, 0, 3]]
+    if len(weight_matrix) != 3 or any(len(row) != 3 for row in weight_matrix):
+        raise ValueError("Weight matrix must be 3x3")
+    second_matrix = [list(row) for row in zip(*weight_matrix[::-1])]
+    gray = img.convert("L")
+    width, height = gray.size
+    new_img = Image.new("L", (width, height))
+    src = gray.load()
+    dst = new_img.load()
+
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            gx = 0.0
+            gy = 0.0
+            for j in range(-1, 2):
+                for i in range(-1, 2):
+                    p = src[x + i, y + j]
+                    gx += p * weight_matrix[j + 1][i + 1]
+                    gy += p * second_matrix[j + 1][i + 1]
+            g = int(math.sqrt(gx * gx + gy * gy))
+            if g > 255:
+                g = 255
+            dst[x, y] = g
+
+    return new_img.convert("RGB")
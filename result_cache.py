@@ -0,0 +1,154 @@
+import hashlib
+import os
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from PIL import Image
+
+
+def image_digest(img: Image.Image) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(img.mode.encode())
+    digest.update(repr(img.size).encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+# Part of every key and disk header. Bump it whenever an operation's output
+# changes, so a persistent cache directory stops serving older results.
+CACHE_VERSION = 2
+
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "LA": 2, "RGB": 3, "RGBA": 4, "I": 4, "F": 4}
+
+
+def image_nbytes(img: Image.Image) -> int:
+    width, height = img.size
+    return width * height * _BYTES_PER_PIXEL.get(img.mode, 4)
+
+
+class ResultCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._digests = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def make_key(self, name, image, params=()):
+        return f"v{CACHE_VERSION}:{name}:{self._digest_of(image)}:{params!r}"
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        image = self._load_from_disk(key)
+        if image is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._store_in_memory(key, image)
+        return image
+
+    def put(self, key, image):
+        self._store_in_memory(key, image)
+        self._save_to_disk(key, image)
+
+    def run(self, name, func, image, *params):
+        key = self.make_key(name, image, params)
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        with self._lock:
+            self.misses += 1
+        result = func(image, *params)
+        self.put(key, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._digests.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _digest_of(self, image):
+        # Hashing the buffer is the expensive part of a lookup, so the digest is
+        # remembered for as long as the image object itself is alive.
+        with self._lock:
+            entry = self._digests.get(id(image))
+        if entry is not None and entry[0]() is image:
+            return entry[1]
+        digest = image_digest(image)
+        with self._lock:
+            self._digests[id(image)] = (weakref.ref(image), digest)
+            if len(self._digests) > 256:
+                self._digests = {k: v for k, v in self._digests.items() if v[0]() is not None}
+        return digest
+
+    def _store_in_memory(self, key, image):
+        size = image_nbytes(image)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= image_nbytes(self._entries.pop(key))
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= image_nbytes(evicted)
+
+    def _disk_path(self, key):
+        name = hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+        return os.path.join(self.disk_dir, name + ".bin")
+
+    def _save_to_disk(self, key, image):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path + ".tmp"
+        try:
+            header = json.dumps({"version": CACHE_VERSION, "key": key, "mode": image.mode, "size": image.size})
+            with open(tmp_path, "wb") as f:
+                f.write(header.encode() + b"\n")
+                f.write(image.tobytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("Cannot write cache entry:", e)
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                data = f.read()
+            if header.get("version") != CACHE_VERSION or header["key"] != key:
+                return None
+            return Image.frombytes(header["mode"], tuple(header["size"]), data)
+        except (OSError, ValueError, KeyError):
+            return None
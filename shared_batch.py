@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image
+from bit_depth import working_mode, to_array, from_array
+from pipeline import Pipeline, parse_step
+from working_buffer import WorkingBuffer, OPERATION_NAMES
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+_blocks = []
+_buffer = None
+
+
+def validate_spec(spec, high_precision=True):
+    unsupported = [entry["op"] for entry in spec if entry.get("op") not in OPERATION_NAMES]
+    if high_precision and unsupported:
+        raise ValueError(f"Operations not supported by the shared-memory batch: {', '.join(unsupported)}")
+    Pipeline.from_spec(None, spec)
+
+
+def _attach(names):
+    global _buffer
+    # Workers are started by the executor and share its resource tracker, so the
+    # blocks stay registered once and are unlinked only by close().
+    _blocks.extend(shared_memory.SharedMemory(name=name) for name in names)
+    # One float32 working buffer per worker, reused for every job it runs.
+    _buffer = WorkingBuffer()
+
+
+def _run_job(slot, shape, dtype, mode, spec, slot_bytes, high_precision):
+    start = time.perf_counter()
+    block = _blocks[slot]
+    pixels = np.ndarray(shape, dtype, buffer=block.buf)
+    if not high_precision:
+        # The regular pipeline, rounding to the image's own type after every step.
+        image = Pipeline.from_spec(from_array(pixels, mode), spec).evaluate()
+        result = to_array(image)
+        if result.nbytes > slot_bytes:
+            raise ValueError(f"Result of {result.nbytes} bytes does not fit a {slot_bytes} byte buffer; "
+                             f"raise slot_bytes")
+        out = np.ndarray(result.shape, result.dtype, buffer=block.buf, offset=slot_bytes)
+        out[...] = result
+        return out.shape, out.dtype.str, working_mode(image), time.perf_counter() - start
+    _buffer.load(pixels, mode)
+    for entry in spec:
+        entry = dict(entry)
+        _buffer.apply(entry.pop("op"), **entry)
+    out = np.ndarray(_buffer.array.shape, _buffer.dtype, buffer=block.buf, offset=slot_bytes)
+    _buffer.to_array(out)
+    return out.shape, out.dtype.str, _buffer.mode, time.perf_counter() - start
+
+
+class SharedBatchExecutor:
+    # Images travel to the workers through a fixed pool of shared memory blocks,
+    # each holding one input and one output image. Only the block index and the
+    # array metadata are pickled; blocks are recycled as soon as a result is read.
+    # Workers run the float32 working buffer unless high_precision is False, in
+    # which case they evaluate the regular pipeline and accept any operation.
+    def __init__(self, spec, workers=None, slot_bytes=64 * 2 ** 20, slots=None, high_precision=True):
+        validate_spec(spec, high_precision)
+        self.spec = spec
+        self.high_precision = high_precision
+        self.workers = workers or os.cpu_count() or 1
+        self.slot_bytes = slot_bytes
+        # Two blocks per worker: one being processed while the next is filled.
+        slots = slots or 2 * self.workers
+        self._blocks = [shared_memory.SharedMemory(create=True, size=2 * slot_bytes) for _ in range(slots)]
+        self._free = list(range(slots))
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_attach,
+                                             initargs=([block.name for block in self._blocks],))
+
+    def map(self, images, timed=False):
+        # With timed=True each result comes with the seconds a worker spent on it.
+        pending = deque()
+        try:
+            for image in images:
+                if not self._free:
+                    yield self._collect(*pending.popleft(), timed)
+                slot = self._free.pop()
+                try:
+                    shape, dtype, mode = self._load(slot, image)
+                except Exception:
+                    self._free.append(slot)
+                    raise
+                pending.append((slot, self._executor.submit(_run_job, slot, shape, dtype, mode, self.spec,
+                                                            self.slot_bytes, self.high_precision)))
+            while pending:
+                yield self._collect(*pending.popleft(), timed)
+        finally:
+            for slot, future in pending:
+                future.cancel()
+
+    def _load(self, slot, image):
+        pixels = to_array(image)
+        if pixels.nbytes > self.slot_bytes:
+            raise ValueError(f"Image of {pixels.nbytes} bytes does not fit a {self.slot_bytes} byte buffer; "
+                             f"raise slot_bytes")
+        view = np.ndarray(pixels.shape, pixels.dtype, buffer=self._blocks[slot].buf)
+        view[...] = pixels
+        return pixels.shape, pixels.dtype.str, working_mode(image)
+
+    def _collect(self, slot, future, timed=False):
+        try:
+            shape, dtype, mode, seconds = future.result()
+            view = np.ndarray(shape, dtype, buffer=self._blocks[slot].buf, offset=self.slot_bytes)
+            # fromarray would wrap the shared block itself for single-channel modes;
+            # copying lets the block be handed to the next job.
+            image = from_array(view.copy(), mode)
+            return (image, seconds) if timed else image
+        finally:
+            self._free.append(slot)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _pickled_job(image, spec):
+    buffer = WorkingBuffer(image)
+    for entry in spec:
+        entry = dict(entry)
+        buffer.apply(entry.pop("op"), **entry)
+    return buffer.to_image()
+
+
+def pickled_map(images, spec, workers=None):
+    # The naive approach, kept for comparison: every image and result is pickled.
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(_pickled_job, images, [spec] * len(images))
+
+
+def list_images(path):
+    return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def _open(paths):
+    for path in paths:
+        image = Image.open(path)
+        image.load()
+        yield image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a pipeline over a directory of images with worker processes sharing memory.")
+    parser.add_argument("input", help="directory of images")
+    parser.add_argument("output", help="directory for the results")
+    parser.add_argument("steps", nargs="*", help="operation steps, e.g. grayscale gaussian:kernel_size=5,sigma=1.5 sobel")
+    parser.add_argument("--spec", help="JSON file with a list of {\"op\": name, ...params} steps")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--slot-mb", type=float, default=64, help="largest decoded image, in MiB")
+    parser.add_argument("--compare-pickled", action="store_true",
+                        help="also time the same batch with images pickled to the workers")
+    args = parser.parse_args(argv)
+
+    spec = [parse_step(step) for step in args.steps]
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f) + spec
+
+    paths = list_images(args.input)
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    with SharedBatchExecutor(spec, args.workers, int(args.slot_mb * 2 ** 20)) as executor:
+        for path, result in zip(paths, executor.map(_open(paths))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            result.save(os.path.join(args.output, f"{name}.png"))
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(paths)} images in {elapsed:.2f} s with shared memory")
+
+    if args.compare_pickled:
+        start = time.perf_counter()
+        for path, result in zip(paths, pickled_map(list(_open(paths)), spec, args.workers)):
+            name = os.path.splitext(os.path.basename(path))[0]
+            result.save(os.path.join(args.output, f"{name}.png"))
+        print(f"Pickled workers took {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_PROFILES = {
+    "source": [sys.executable, "main.py"],
+    "onefile": [os.path.join("dist", "main.exe" if os.name == "nt" else "main")],
+    "onedir": [os.path.join("dist", "main_fast", "main.exe" if os.name == "nt" else "main")],
+}
+
+
+def launch(command, timeout):
+    start = time.perf_counter()
+    process = subprocess.Popen(command + ["--startup-probe"], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True)
+    try:
+        line = process.stdout.readline()
+        ready = time.perf_counter() - start
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        raise RuntimeError(f"{command[0]} did not exit within {timeout} s")
+    if not line.strip().startswith("{"):
+        raise RuntimeError(f"{command[0]} printed no start-up timings: {process.stderr.read().strip()}")
+
+    timings = json.loads(line)
+    # The probe reports once the engines are loaded. Times inside the process
+    # start at main.py, after the bootloader has unpacked and started Python,
+    # so the wall-clock time to interactive is derived from the report time.
+    in_process_gap = timings["engines_ready_s"] - timings["interactive_s"]
+    return {
+        "interactive_s": ready - in_process_gap,
+        "engines_ready_s": ready,
+        "python_interactive_s": timings["interactive_s"],
+    }
+
+
+def run_profile(command, runs, timeout, warmup=1):
+    for _ in range(warmup):
+        launch(command, timeout)
+    return [launch(command, timeout) for _ in range(runs)]
+
+
+def summarize(samples):
+    summary = {}
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        summary[key] = {"median_s": statistics.median(values), "min_s": min(values), "max_s": max(values)}
+    return summary
+
+
+def parse_profile(text):
+    name, separator, command = text.partition("=")
+    if not separator or not command.strip():
+        raise argparse.ArgumentTypeError("expected NAME=COMMAND")
+    return name.strip(), command.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the launch time of the application built with different packaging profiles.")
+    parser.add_argument("--profile", action="append", type=parse_profile, metavar="NAME=COMMAND",
+                        help="profile to measure (repeatable); defaults to source, dist/main and dist/main_fast")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiles = dict(args.profile)
+    else:
+        profiles = {name: command for name, command in DEFAULT_PROFILES.items()
+                    if name == "source" or os.path.exists(command[0])}
+
+    results = {}
+    print(f"{'profile':<10} {'interactive ms':>15} {'engines ready ms':>17} {'in python ms':>13}")
+    for name, command in profiles.items():
+        try:
+            summary = summarize(run_profile(command, args.runs, args.timeout))
+        except (OSError, RuntimeError) as e:
+            print(f"{name:<10} failed: {e}")
+            continue
+        results[name] = {"command": command, "runs": args.runs, **summary}
+        print(f"{name:<10} {summary['interactive_s']['median_s'] * 1000:>15.0f} "
+              f"{summary['engines_ready_s']['median_s'] * 1000:>17.0f} "
+              f"{summary['python_interactive_s']['median_s'] * 1000:>13.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
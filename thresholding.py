@@ -0,0 +1,137 @@
+import numpy as np
+from PIL import Image
+from bit_depth import gray_histogram, working_mode, max_value, to_array
+from image_processing import ImageProcessor
+
+
+def otsu_threshold(counts) -> int:
+    counts = np.asarray(counts, dtype=np.float64)
+    levels = np.arange(len(counts))
+    weight_low = np.cumsum(counts)
+    weight_high = weight_low[-1] - weight_low
+    sum_low = np.cumsum(counts * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_low = sum_low / weight_low
+        mean_high = (sum_low[-1] - sum_low) / weight_high
+        between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def triangle_threshold(counts) -> int:
+    counts = np.asarray(counts, dtype=np.float64)
+    occupied = np.flatnonzero(counts)
+    if len(occupied) == 0:
+        return 0
+    first, last = occupied[0], occupied[-1]
+    peak = int(np.argmax(counts))
+    # The line runs from the peak to the end of the longer tail; the threshold
+    # is the bin furthest below it.
+    end = first if peak - first > last - peak else last
+    levels = np.arange(min(peak, end), max(peak, end) + 1)
+    dx = end - peak
+    dy = counts[end] - counts[peak]
+    distance = np.abs(dy * (levels - peak) - dx * (counts[levels] - counts[peak]))
+    return int(levels[np.argmax(distance)])
+
+
+def isodata_threshold(counts, tolerance=0.5) -> int:
+    counts = np.asarray(counts, dtype=np.float64)
+    levels = np.arange(len(counts))
+    weight_low = np.cumsum(counts)
+    sum_low = np.cumsum(counts * levels)
+    if weight_low[-1] == 0:
+        return 0
+    threshold = sum_low[-1] / weight_low[-1]
+    for _ in range(len(counts)):
+        k = int(threshold)
+        weight_high = weight_low[-1] - weight_low[k]
+        if weight_low[k] == 0 or weight_high == 0:
+            break
+        mean_low = sum_low[k] / weight_low[k]
+        mean_high = (sum_low[-1] - sum_low[k]) / weight_high
+        updated = (mean_low + mean_high) / 2
+        if abs(updated - threshold) < tolerance:
+            threshold = updated
+            break
+        threshold = updated
+    return int(threshold)
+
+
+THRESHOLD_METHODS = {
+    "otsu": otsu_threshold,
+    "triangle": triangle_threshold,
+    "isodata": isodata_threshold,
+}
+
+
+def threshold_from_histogram(counts, upper, method="otsu"):
+    if method not in THRESHOLD_METHODS:
+        raise ValueError(f"Unknown threshold method '{method}', expected one of: {', '.join(THRESHOLD_METHODS)}")
+    k = THRESHOLD_METHODS[method](counts)
+    # Bins 0..k are background; binarize keeps pixels strictly above the value.
+    edge = (k + 1) * upper / len(counts)
+    if isinstance(upper, float):
+        return edge
+    return int(round(edge)) - 1
+
+
+def auto_binarize(img: Image.Image, method="otsu", bins=256) -> Image.Image:
+    counts, upper = gray_histogram(img, bins)
+    return ImageProcessor.binarize(img, threshold_from_histogram(counts, upper, method))
+
+
+ADAPTIVE_METHODS = ("mean", "niblack", "sauvola")
+ADAPTIVE_K = {"mean": 0.0, "niblack": -0.2, "sauvola": 0.34}
+
+
+def _integral(values):
+    # Summed-area table with a leading row and column of zeros.
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1))
+    np.cumsum(values, axis=0, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def _window_bounds(length, radius):
+    positions = np.arange(length)
+    return np.clip(positions - radius, 0, length), np.clip(positions + radius + 1, 0, length)
+
+
+def _window_sums(table, top, bottom, left, right):
+    return (table[bottom[:, None], right] - table[top[:, None], right]
+            - table[bottom[:, None], left] + table[top[:, None], left])
+
+
+def local_mean_std(gray: np.ndarray, window: int):
+    # Four table lookups per pixel, whatever the window size. Windows are cut at
+    # the border and averaged over the pixels they actually cover.
+    radius = window // 2
+    top, bottom = _window_bounds(gray.shape[0], radius)
+    left, right = _window_bounds(gray.shape[1], radius)
+    count = (bottom - top)[:, None] * (right - left)
+    # Variance does not depend on the offset; centring keeps the squared sums of
+    # 16-bit images within float64 precision.
+    centred = gray - gray.mean()
+    mean = _window_sums(_integral(centred), top, bottom, left, right) / count
+    square = _window_sums(_integral(centred * centred), top, bottom, left, right) / count
+    std = np.sqrt(np.maximum(square - mean * mean, 0))
+    return mean + gray.mean(), std
+
+
+def adaptive_binarize(img: Image.Image, method="sauvola", window=25, k=None, offset=0) -> Image.Image:
+    if method not in ADAPTIVE_METHODS:
+        raise ValueError(f"Unknown adaptive method '{method}', expected one of: {', '.join(ADAPTIVE_METHODS)}")
+    if window < 3 or window % 2 == 0:
+        raise ValueError("Window size must be an odd number of at least 3")
+    if k is None:
+        k = ADAPTIVE_K[method]
+    gray = to_array(ImageProcessor.to_grayscale(img)).astype(np.float64)
+    mean, std = local_mean_std(gray, window)
+    if method == "mean":
+        threshold = mean - offset
+    elif method == "niblack":
+        threshold = mean + k * std - offset
+    else:
+        dynamic_range = max_value(working_mode(img)) / 2
+        threshold = mean * (1 + k * (std / dynamic_range - 1)) - offset
+    return Image.fromarray(np.where(gray > threshold, 255, 0).astype(np.uint8))
@@ -3,6 +3,9 @@ from tkinter import filedialog
 import os
 import webbrowser
 import sys
+from lazy_modules import LazyModule
+
+bit_depth = LazyModule("bit_depth")
 
 class TopBar(tk.Frame):
     def __init__(self, master):
@@ -13,6 +16,8 @@ class TopBar(tk.Frame):
         self.file_menu = tk.Menu(self, tearoff=0)
         self.file_menu.add_command(label='Read image', command=self.read_image)
 
+        self.save_gray_as_rgb = tk.BooleanVar(value=False)
+
         self.file_button = tk.Button(self, text="File", relief=tk.FLAT, bg="lightgray", command=self.show_file_menu)
         self.file_button.pack(side=tk.LEFT)
 
@@ -26,6 +31,7 @@ class TopBar(tk.Frame):
 
         self.help_menu = tk.Menu(self, tearoff=0)
         self.help_menu.add_command(label='Information', command=self.show_information)
+        self.help_menu.add_command(label='Performance statistics', command=self.show_performance)
 
         self.help_button = tk.Button(self, text="Help", relief=tk.FLAT, bg="lightgray", command=self.show_help_menu)
         self.help_button.pack(side=tk.LEFT)
@@ -34,28 +40,40 @@ class TopBar(tk.Frame):
 
     def read_image(self):
         photo_opened = filedialog.askopenfilenames(title='Select a specific photo',
-                                                   filetypes=[("Image Files", "*.jpg *.png")])
+                                                   filetypes=[("Image Files", "*.jpg *.png *.tif *.tiff")])
         if photo_opened:
             main_window = self.master
             self.counter += 1
 
             if self.counter == 1:
                 self.file_menu.add_command(label="Save image", command=self.save_image)
+                self.file_menu.add_checkbutton(label="Save grayscale as RGB", variable=self.save_gray_as_rgb)
 
             main_window.image_shower(photo_opened)
 
     def save_image(self):
         main_window = self.master
+        image = main_window.modified_image
+        if image is None:
+            print("No image loaded.")
+            return
 
+        # TIFF keeps 16-bit and float images as they are.
         file_path = filedialog.asksaveasfilename(
             title="Save Image As",
-            defaultextension=".jpg",
-            filetypes=[("PNG Files", "*.png"), ("JPEG Files", "*.jpg"), ("All Files", "*.*")]
+            defaultextension=".tif" if bit_depth.is_high_bit_depth(image) else ".jpg",
+            filetypes=[("PNG Files", "*.png"), ("JPEG Files", "*.jpg"), ("TIFF Files", "*.tif *.tiff"),
+                       ("All Files", "*.*")]
         )
 
         if file_path:
             try:
-                main_window.modified_image.save(file_path)
+                if self.save_gray_as_rgb.get() and image.mode == "L":
+                    image = image.convert("RGB")
+                if os.path.splitext(file_path)[1].lower() in (".jpg", ".jpeg"):
+                    # JPEG has no 16-bit or float variant; scale those down to 8 bits.
+                    image = bit_depth.to_display_image(image)
+                image.save(file_path)
             except Exception as e:
                 tk.messagebox.showerror("Save Image", f"Error while saving image: {e}")
 
@@ -100,6 +118,11 @@ class TopBar(tk.Frame):
         url = f"file:///{pdf_path}"
         webbrowser.open_new(url)
 
+    def show_performance(self):
+        main_window = self.master
+        if hasattr(main_window, "show_performance_window"):
+            main_window.show_performance_window()
+
     def show_file_menu(self):
         x = self.file_button.winfo_rootx()
         y = self.file_button.winfo_rooty() + self.file_button.winfo_height()
@@ -1,16 +1,24 @@
 import tkinter as tk
 from topbar import TopBar
 from PIL import Image, ImageTk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from image_processing import ImageProcessor
-from tkinter import messagebox
-from graphics_filter import apply_gaussian_filter, apply_sharpening_filter, apply_averaging_filter
-from edge_detection import (roberts_cross_own_working_way, sobel_operator_own_working_way,
-                            scharr_operator_own_working_way, laplace_operator_own_working_way)
+from tkinter import messagebox, filedialog
 from operation_reversor import OperationReversor
+from result_cache import ResultCache
+from instrumentation import OperationProfiler, format_record, format_summary
+from lazy_modules import LazyModule, Preloader
 from looks_options import DARK_THEME, LIGHT_THEME
-import numpy as np
+import os
+
+# matplotlib and the processing engines take most of the start-up time. They are
+# loaded in the background once the welcome screen is shown, or on first use.
+np = LazyModule("numpy")
+bit_depth = LazyModule("bit_depth")
+pipeline = LazyModule("pipeline")
+thresholding = LazyModule("thresholding")
+working_buffer = LazyModule("working_buffer")
+figure = LazyModule("matplotlib.figure")
+backend_tkagg = LazyModule("matplotlib.backends.backend_tkagg")
+BACKGROUND_MODULES = (np, bit_depth, pipeline, thresholding, working_buffer, figure, backend_tkagg)
 
 
 class ModernTheme:
@@ -25,33 +33,31 @@ class ModernTheme:
     BUTTON_HOVER = "#2563EB"
 
 
-def plot_gray_histogram_in_frame(frame, image, title="Histogram"):
+def plot_gray_histogram_in_frame(frame, image, title="Histogram", bins=256, histogram=None):
 
-    gray = image.convert("L")
-    hist = gray.histogram()
+    hist, upper = histogram if histogram is not None else bit_depth.gray_histogram(image, bins)
+    bin_width = upper / len(hist)
 
-    fig, ax = plt.subplots(figsize=(3, 2), dpi=100)
+    fig = figure.Figure(figsize=(3, 2), dpi=100)
+    ax = fig.subplots()
     fig.patch.set_facecolor("#f5f5f5")
     ax.set_facecolor('#FCFCFC')
 
-    ax.bar(range(256), hist, width=1, color="gray", edgecolor="black")
+    ax.bar(np.arange(len(hist)) * bin_width, hist, width=bin_width, align="edge", color="gray", edgecolor="black")
     ax.set_title(title, fontsize=10)
     ax.set_xlabel("Intensity", fontsize=8)
     ax.set_ylabel("Count", fontsize=8)
     ax.tick_params(axis='both', labelsize=8)
     fig.tight_layout()
 
-    canvas = FigureCanvasTkAgg(fig, master=frame)
+    canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=frame)
     canvas.draw()
     canvas.get_tk_widget().pack(fill="both", expand=True, anchor="center")
     return canvas
 
 
 def project_image(image, projection_type, return_projection=False):
-    if image.mode != "L":
-        image = image.convert("L")
-
-    img_array = np.array(image)
+    img_array = bit_depth.gray_array(image)
     height, width = img_array.shape
 
     if projection_type == "Horizontal":
@@ -104,6 +110,31 @@ class MainWindow(tk.Frame):
 
         self.operation_reverse = OperationReversor()
         self.custom_weight_matrix = None
+        self.result_cache = ResultCache(disk_dir=os.environ.get("BIOMETRICS_CACHE_DIR"))
+        self.high_precision = tk.BooleanVar(value=False)
+        self.histogram_bins = tk.IntVar(value=256)
+        self.modified_histogram = None
+        self.threshold_method = tk.StringVar(value="otsu")
+        self.gaussian_recursive = tk.BooleanVar(value=False)
+        self.adaptive_method = tk.StringVar(value="sauvola")
+        self.all_pyramid_levels = tk.BooleanVar(value=False)
+        self.profiler = OperationProfiler()
+        self.performance_window = None
+        self.working_buffer = None
+        self.preloader = None
+
+    def start_background_loading(self, on_ready=None):
+        self.preloader = Preloader(BACKGROUND_MODULES).start()
+        self._wait_for_preload(on_ready)
+
+    def _wait_for_preload(self, on_ready):
+        if not self.preloader.done():
+            self.after(20, self._wait_for_preload, on_ready)
+            return
+        if self.preloader.error is not None:
+            print("Background loading failed:", self.preloader.error)
+        if on_ready:
+            on_ready(self.preloader.elapsed)
 
     def show_welcome_message(self):
         self.welcome_label = tk.Label(
@@ -146,6 +177,9 @@ class MainWindow(tk.Frame):
         self.top_bar = TopBar(self)
         self.top_bar.pack(fill=tk.X, side=tk.TOP)
 
+        self.status_bar = tk.Label(self, text="", anchor="w", font=("Helvetica", 8), bg="#E5E7EB", fg="black")
+        self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+
         self.content = tk.Frame(self, bg='white')
         self.content.pack(fill='both', expand=True)
 
@@ -156,6 +190,8 @@ class MainWindow(tk.Frame):
                 return
 
             self.modified_image = self.operation_reverse.pop()
+            self._reset_working_buffer()
+            self._update_threshold_range()
             self._display_image_in_panel(self.image_container, self.modified_image)
             self.update_modified_histogram()
             self.update_projections()
@@ -219,12 +255,27 @@ class MainWindow(tk.Frame):
         tk.Button(btn_frame, text="OK", command=on_ok).pack(side="left", padx=5)
         tk.Button(btn_frame, text="Cancel", command=on_cancel).pack(side="left", padx=5)
 
+    def update_original_histogram(self):
+        for widget in self.hist_original_panel.winfo_children():
+            widget.destroy()
+
+        if self.original_image:
+            plot_gray_histogram_in_frame(self.hist_original_panel, self.original_image, "Original Histogram",
+                                         self.histogram_bins.get())
+
+    def refresh_histograms(self):
+        self.update_original_histogram()
+        self.update_modified_histogram()
+
     def update_modified_histogram(self):
         for widget in self.hist_modified_panel.winfo_children():
             widget.destroy()
 
         if self.modified_image:
-            plot_gray_histogram_in_frame(self.hist_modified_panel, self.modified_image, "Modified Histogram")
+            # Kept for the automatic threshold methods, which work on the histogram alone.
+            self.modified_histogram = bit_depth.gray_histogram(self.modified_image, self.histogram_bins.get())
+            plot_gray_histogram_in_frame(self.hist_modified_panel, self.modified_image, "Modified Histogram",
+                                         histogram=self.modified_histogram)
 
     def image_shower(self, files):
         self.hide_welcome_message()
@@ -271,12 +322,21 @@ class MainWindow(tk.Frame):
         btn_vertical.pack(side="left", padx=5, pady=5)
         btn_none.pack(side="left", padx=5, pady=5)
 
+        bins_spinbox = tk.Spinbox(projection_frame, values=(16, 32, 64, 128, 256, 512, 1024, 4096),
+                                  textvariable=self.histogram_bins, width=5, font=("Helvetica", 8),
+                                  command=self.refresh_histograms)
+        self.histogram_bins.set(256)
+        bins_spinbox.pack(side="right", padx=5, pady=5)
+        tk.Label(projection_frame, text="Histogram bins:", font=("Helvetica", 8), bg="#F0F0F0",
+                 fg="black").pack(side="right", pady=5)
+
         weights_container = tk.Frame(self.left_panel, bg="#F0F0F0")
         weights_container.pack(side="top", fill="x", padx=5, pady=5)
 
         self._create_weights_frame(weights_container)
         self._create_reverse_frame(weights_container)
         self._create_edge_frame(self.left_panel)
+        self._create_morphology_frame(self.left_panel)
 
         hist_container = tk.Frame(self.left_panel, bg="#F0F0F0")
         hist_container.pack(side="top", fill="both", expand=True, padx=5, pady=5)
@@ -334,11 +394,14 @@ class MainWindow(tk.Frame):
             print("Błąd podczas otwierania obrazu:", e)
             return
 
+        self._reset_working_buffer()
+
         self._display_image_in_panel(self.image_container, self.modified_image)
         self._display_image_in_panel(self.bottom_subpanel, self.original_image)
 
-        plot_gray_histogram_in_frame(self.hist_original_panel, self.original_image, "Original Histogram")
-        plot_gray_histogram_in_frame(self.hist_modified_panel, self.modified_image, "Modified Histogram")
+        self._update_threshold_range()
+        self.update_original_histogram()
+        self.update_modified_histogram()
 
         self.update_projections()
 
@@ -444,6 +507,87 @@ class MainWindow(tk.Frame):
         self.biner_scale.grid(row=7, column=0, columnspan=2, padx=10, pady=(5, 10), sticky="we")
         self.biner_scale.bind("<ButtonRelease-1>", self.apply_binarization)
 
+        threshold_menu = tk.OptionMenu(self.operations_frame, self.threshold_method, "otsu", "triangle", "isodata")
+        threshold_menu.configure(font=("Helvetica", 8), bg="lightgray")
+        threshold_menu.grid(row=8, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        btn_auto_threshold = tk.Button(
+            self.operations_frame,
+            text="Auto threshold",
+            font=("Helvetica", 8),
+            bg="lightgray",
+            command=self.apply_auto_threshold
+        )
+        btn_auto_threshold.grid(row=8, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        adaptive_menu = tk.OptionMenu(self.operations_frame, self.adaptive_method, "mean", "niblack", "sauvola")
+        adaptive_menu.configure(font=("Helvetica", 8), bg="lightgray")
+        adaptive_menu.grid(row=9, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        btn_adaptive_threshold = tk.Button(
+            self.operations_frame,
+            text="Adaptive threshold",
+            font=("Helvetica", 8),
+            bg="lightgray",
+            command=self.apply_adaptive_threshold
+        )
+        btn_adaptive_threshold.grid(row=9, column=1, padx=10, pady=(0, 10), sticky="w")
+
+        window_label = tk.Label(
+            self.operations_frame,
+            text="Window size:",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black"
+        )
+        window_label.grid(row=10, column=0, sticky="w", padx=10, pady=(0, 10))
+
+        self.adaptive_window_entry = tk.Entry(self.operations_frame, width=5, font=("Helvetica", 8))
+        self.adaptive_window_entry.insert(0, "25")
+        self.adaptive_window_entry.grid(row=10, column=1, sticky="w", padx=10, pady=(0, 10))
+        self.adaptive_window_entry.bind("<Return>", self.apply_adaptive_threshold)
+
+        btn_equalize = tk.Button(
+            self.operations_frame,
+            text="Equalize",
+            font=("Helvetica", 8),
+            bg="lightgray",
+            command=self.apply_equalization
+        )
+        btn_equalize.grid(row=11, column=0, padx=10, pady=(0, 5), sticky="w")
+
+        btn_clahe = tk.Button(
+            self.operations_frame,
+            text="CLAHE",
+            font=("Helvetica", 8),
+            bg="lightgray",
+            command=self.apply_clahe
+        )
+        btn_clahe.grid(row=11, column=1, padx=10, pady=(0, 5), sticky="w")
+
+        self.clahe_clip_scale = tk.Scale(
+            self.operations_frame,
+            label="CLAHE clip limit",
+            from_=1,
+            to=10,
+            resolution=0.5,
+            orient="horizontal",
+            length=150
+        )
+        self.clahe_clip_scale.set(2.0)
+        self.clahe_clip_scale.grid(row=12, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="we")
+
+        precision_check = tk.Checkbutton(
+            self.operations_frame,
+            text="High precision (float32)",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black",
+            variable=self.high_precision,
+            command=self._reset_working_buffer
+        )
+        precision_check.grid(row=13, column=0, columnspan=2, sticky="w", padx=10, pady=(0, 10))
+
     def _create_graphics_frame(self, parent):
         self.graphics_frame = tk.LabelFrame(
             parent,
@@ -501,6 +645,17 @@ class MainWindow(tk.Frame):
         self.gaussian_kernel_entry.insert(0, "3")
         self.gaussian_kernel_entry.grid(row=1, column=1, sticky="w", padx=5, pady=5)
 
+        recursive_check = tk.Checkbutton(
+            gaussian_frame,
+            text="Recursive (any sigma)",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black",
+            variable=self.gaussian_recursive,
+            command=self._update_sigma_range
+        )
+        recursive_check.grid(row=2, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
         sharpening_frame = tk.LabelFrame(
             self.graphics_frame,
             text="Sharpening filter",
@@ -570,6 +725,84 @@ class MainWindow(tk.Frame):
         self.averaging_kernel_entry.grid(row=0, column=1, sticky="w", padx=5, pady=5)
         self.averaging_kernel_entry.bind("<Return>", self.apply_averaging_filter_event)
 
+        median_frame = tk.LabelFrame(
+            self.graphics_frame,
+            text="Median filter",
+            font=("Helvetica", 8, "bold"),
+            bg="#F0F0F0",
+            fg="black",
+            bd=1,
+            relief="groove"
+        )
+        median_frame.pack(side="top", fill="x", padx=5, pady=5)
+
+        median_kernel_label = tk.Label(
+            median_frame,
+            text="Kernel size:",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black"
+        )
+        median_kernel_label.grid(row=0, column=0, sticky="w", padx=5, pady=5)
+
+        self.median_kernel_entry = tk.Entry(median_frame, width=5, font=("Helvetica", 8))
+        self.median_kernel_entry.insert(0, "3")
+        self.median_kernel_entry.grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        self.median_kernel_entry.bind("<Return>", self.apply_median_filter_event)
+
+        bilateral_frame = tk.LabelFrame(
+            self.graphics_frame,
+            text="Bilateral filter",
+            font=("Helvetica", 8, "bold"),
+            bg="#F0F0F0",
+            fg="black",
+            bd=1,
+            relief="groove"
+        )
+        bilateral_frame.pack(side="top", fill="x", padx=5, pady=5)
+
+        bilateral_sigma_label = tk.Label(
+            bilateral_frame,
+            text="Sigma:",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black"
+        )
+        bilateral_sigma_label.grid(row=0, column=0, sticky="w", padx=5, pady=5)
+
+        self.bilateral_sigma_scale = tk.Scale(
+            bilateral_frame,
+            from_=1,
+            to=50,
+            resolution=0.5,
+            orient="horizontal",
+            length=150
+        )
+        self.bilateral_sigma_scale.set(8.0)
+        self.bilateral_sigma_scale.grid(row=0, column=1, sticky="we", padx=5, pady=5)
+        self.bilateral_sigma_scale.bind("<ButtonRelease-1>", self.apply_bilateral_filter_event)
+
+        bilateral_range_label = tk.Label(
+            bilateral_frame,
+            text="Range:",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black"
+        )
+        bilateral_range_label.grid(row=1, column=0, sticky="w", padx=5, pady=5)
+
+        self.bilateral_range_scale = tk.Scale(
+            bilateral_frame,
+            from_=0.01,
+            to=0.5,
+            resolution=0.01,
+            orient="horizontal",
+            length=150
+        )
+        self.bilateral_range_scale.set(0.1)
+        self.bilateral_range_scale.grid(row=1, column=1, sticky="we", padx=5, pady=5)
+        self.bilateral_range_scale.bind("<ButtonRelease-1>", self.apply_bilateral_filter_event)
+
     def _create_weights_frame(self, parent):
         weights_frame = tk.LabelFrame(
             parent,
@@ -664,6 +897,13 @@ class MainWindow(tk.Frame):
             bg="lightgray",
             command=self.apply_laplace_operator_event
         )
+        btn_canny = tk.Button(
+            edge_frame,
+            text="Canny",
+            font=("Helvetica", 8),
+            bg="lightgray",
+            command=self.apply_canny_event
+        )
         btn_custom = tk.Button(
             edge_frame,
             text="Custom Detection",
@@ -676,52 +916,241 @@ class MainWindow(tk.Frame):
         btn_sobel.pack(side="left", padx=5, pady=5)
         btn_scharr.pack(side="left", padx=5, pady=5)
         btn_laplace.pack(side="left", padx=5, pady=5)
+        btn_canny.pack(side="left", padx=5, pady=5)
         btn_custom.pack(side="left", padx=5, pady=5)
 
+        self.canny_low_scale = tk.Scale(
+            edge_frame,
+            label="Canny low",
+            from_=0,
+            to=1,
+            resolution=0.01,
+            orient="horizontal",
+            length=90
+        )
+        self.canny_low_scale.set(0.1)
+        self.canny_low_scale.pack(side="left", padx=5, pady=5)
+
+        self.canny_high_scale = tk.Scale(
+            edge_frame,
+            label="Canny high",
+            from_=0,
+            to=1,
+            resolution=0.01,
+            orient="horizontal",
+            length=90
+        )
+        self.canny_high_scale.set(0.2)
+        self.canny_high_scale.pack(side="left", padx=5, pady=5)
+
+        self.pyramid_level_scale = tk.Scale(
+            edge_frame,
+            label="Pyramid level",
+            from_=0,
+            to=4,
+            orient="horizontal",
+            length=90
+        )
+        self.pyramid_level_scale.set(0)
+        self.pyramid_level_scale.pack(side="left", padx=5, pady=5)
+
+        all_levels_check = tk.Checkbutton(
+            edge_frame,
+            text="Up to level",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black",
+            variable=self.all_pyramid_levels
+        )
+        all_levels_check.pack(side="left", padx=5, pady=5)
+
+    def _create_morphology_frame(self, parent):
+        morphology_frame = tk.LabelFrame(
+            parent,
+            text="Morphology",
+            font=("Helvetica", 8, "bold"),
+            bg="#F0F0F0",
+            fg="black",
+            bd=2,
+            relief="groove"
+        )
+        morphology_frame.pack(side="top", fill="x", padx=5, pady=5)
+
+        size_label = tk.Label(
+            morphology_frame,
+            text="Element size:",
+            font=("Helvetica", 8),
+            bg="#F0F0F0",
+            fg="black"
+        )
+        size_label.pack(side="left", padx=5, pady=5)
+
+        self.morphology_size_entry = tk.Entry(morphology_frame, width=5, font=("Helvetica", 8))
+        self.morphology_size_entry.insert(0, "3")
+        self.morphology_size_entry.pack(side="left", padx=5, pady=5)
+
+        for text, name in (("Erode", "erode"), ("Dilate", "dilate"), ("Opening", "opening"),
+                           ("Closing", "closing"), ("Skeleton", "skeletonize")):
+            tk.Button(
+                morphology_frame,
+                text=text,
+                font=("Helvetica", 8),
+                bg="lightgray",
+                command=lambda name=name: self.apply_morphology(name)
+            ).pack(side="left", padx=5, pady=5)
+
+    def _reset_working_buffer(self):
+        if self.high_precision.get() and self.modified_image is not None:
+            self.working_buffer = working_buffer.WorkingBuffer(self.modified_image)
+        else:
+            self.working_buffer = None
+
+    def _update_threshold_range(self):
+        limit = bit_depth.max_value(bit_depth.working_mode(self.modified_image))
+        if float(self.biner_scale.cget("to")) == limit:
+            return
+        relative = self.biner_scale.get() / float(self.biner_scale.cget("to"))
+        self.biner_scale.configure(to=limit, resolution=1 if limit > 1 else 0.01)
+        self.biner_scale.set(round(relative * limit) if limit > 1 else relative * limit)
+
+    def _apply_operation(self, name, **params):
+        with self.profiler.operation(name):
+            previous_image = self.modified_image
+            with self.profiler.stage("compute"):
+                if self.working_buffer is not None and name in working_buffer.OPERATION_NAMES:
+                    self.modified_image = self.working_buffer.apply(name, **params).to_image()
+                else:
+                    steps = pipeline.Pipeline(self.modified_image).then(name, **params)
+                    self.modified_image = steps.evaluate(self.result_cache)
+                    self._reset_working_buffer()
+            with self.profiler.stage("undo push"):
+                self.operation_reverse.push(previous_image)
+
+            self._update_threshold_range()
+            with self.profiler.stage("display"):
+                self._display_image_in_panel(self.image_container, self.modified_image)
+            with self.profiler.stage("histogram"):
+                self.update_modified_histogram()
+            with self.profiler.stage("projections"):
+                self.update_projections()
+
+        self.status_bar.configure(text=format_record(self.profiler.last()))
+        self._refresh_performance_window()
+
+    def show_performance_window(self):
+        if self.performance_window is not None and self.performance_window.winfo_exists():
+            self.performance_window.lift()
+            return
+
+        window = tk.Toplevel(self)
+        window.title("Performance statistics")
+        self.performance_window = window
+
+        self.performance_text = tk.Text(window, width=110, height=20, font=("Courier", 9))
+        self.performance_text.pack(fill="both", expand=True, padx=5, pady=5)
+
+        btn_frame = tk.Frame(window)
+        btn_frame.pack(side="bottom", pady=5)
+
+        track_memory = tk.BooleanVar(value=self.profiler.track_memory)
+        tk.Checkbutton(btn_frame, text="Track allocations", variable=track_memory,
+                       command=lambda: self.profiler.set_track_memory(track_memory.get())).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Export log", command=self.export_performance_log).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Clear", command=self._clear_performance_stats).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Close", command=window.destroy).pack(side="left", padx=5)
+
+        self._refresh_performance_window()
+
+    def _refresh_performance_window(self):
+        if self.performance_window is None or not self.performance_window.winfo_exists():
+            return
+        self.performance_text.configure(state="normal")
+        self.performance_text.delete("1.0", tk.END)
+        self.performance_text.insert(tk.END, format_summary(self.profiler.summary()))
+        self.performance_text.configure(state="disabled")
+
+    def _clear_performance_stats(self):
+        self.profiler.clear()
+        self._refresh_performance_window()
+
+    def export_performance_log(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Export performance log",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("All Files", "*.*")]
+        )
+        if file_path:
+            try:
+                self.profiler.export(file_path)
+            except OSError as e:
+                messagebox.showerror("Export", f"Error while exporting log: {e}")
+
+    def _apply_edge_operator(self, name):
+        # Level 0 is the native resolution; coarser levels find large structures
+        # that fine texture hides, and cost a quarter as much per level.
+        level = self.pyramid_level_scale.get()
+        if level and self.all_pyramid_levels.get():
+            self._apply_operation("scale_space_edges", operator=name, levels=level + 1)
+        elif level:
+            self._apply_operation("pyramid_edges", operator=name, level=level)
+        else:
+            self._apply_operation(name)
+
     def apply_roberts_cross_event(self, event=None):
-        self.operation_reverse.push(self.modified_image)
         try:
-            new_image = roberts_cross_own_working_way(self.modified_image, None)
-            self.modified_image = new_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
+            self._apply_edge_operator("roberts")
         except Exception as e:
             messagebox.showerror("Error", f"Roberts operator error: {str(e)}")
 
     def apply_sobel_operator_event(self, event=None):
-        self.operation_reverse.push(self.modified_image)
         try:
-            new_image = sobel_operator_own_working_way(self.modified_image, None)
-            self.modified_image = new_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
+            self._apply_edge_operator("sobel")
         except Exception as e:
             messagebox.showerror("Error", f"Sobel operator error: {str(e)}")
 
     def apply_scharr_operator_event(self, event=None):
-        self.operation_reverse.push(self.modified_image)
         try:
-            new_image = scharr_operator_own_working_way(self.modified_image, None)
-            self.modified_image = new_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
+            self._apply_edge_operator("scharr")
         except Exception as e:
             messagebox.showerror("Error", f"Scharr operator error: {str(e)}")
 
     def apply_laplace_operator_event(self, event=None):
-        self.operation_reverse.push(self.modified_image)
         try:
-            new_image = laplace_operator_own_working_way(self.modified_image, None)
-            self.modified_image = new_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
+            self._apply_edge_operator("laplace")
         except Exception as e:
             messagebox.showerror("Error", f"Laplace operator error: {str(e)}")
 
+    def apply_canny_event(self, event=None):
+        low, high = self.canny_low_scale.get(), self.canny_high_scale.get()
+        if low > high:
+            messagebox.showinfo("Invalid Input", "The low threshold must not exceed the high one.")
+            return
+        try:
+            self._apply_operation("canny", low=low, high=high)
+        except Exception as e:
+            messagebox.showerror("Error", f"Canny error: {str(e)}")
+
+    def apply_morphology(self, name):
+        if not self.modified_image:
+            print("No image loaded.")
+            return
+        params = {}
+        if name != "skeletonize":
+            try:
+                size = int(self.morphology_size_entry.get().strip())
+            except ValueError:
+                messagebox.showinfo("Invalid Input", "Element size must be an integer.")
+                return
+            if size < 1:
+                messagebox.showinfo("Invalid Input", "Element size must be at least 1.")
+                return
+            params["width"] = size
+
+        try:
+            self._apply_operation(name, **params)
+        except Exception as e:
+            messagebox.showerror("Error", f"Morphology error: {str(e)}")
+
     def apply_custom_detection_event(self, event=None):
         if self.custom_weight_matrix is None:
             messagebox.showinfo("Error", "Please set a custom matrix (minimum size 2x2).")
@@ -732,18 +1161,9 @@ class MainWindow(tk.Frame):
             messagebox.showinfo("Error", "Custom matrix must be 2x2 or 3x3.")
             return
 
-        self.operation_reverse.push(self.modified_image)
         try:
-            if size == 2:
-                new_image = roberts_cross_own_working_way(self.modified_image, self.custom_weight_matrix)
-            else:
-                new_image = sobel_operator_own_working_way(self.modified_image, self.custom_weight_matrix)
-
-            self.modified_image = new_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
-
+            operation = "roberts" if size == 2 else "sobel"
+            self._apply_operation(operation, weight_matrix=self.custom_weight_matrix)
         except Exception as e:
             messagebox.showerror("Error", f"Custom detection error: {str(e)}")
 
@@ -816,19 +1236,21 @@ class MainWindow(tk.Frame):
                     self.horizontal_projection_container = None
 
     def _display_horizontal_projection(self, projection_data):
-        fig, ax = plt.subplots(figsize=(6, 1.5), dpi=80)
+        fig = figure.Figure(figsize=(6, 1.5), dpi=80)
+        ax = fig.subplots()
         ax.plot(projection_data, color="black", linewidth=1)
         ax.set_title("Horizontal Projection", fontsize=8)
         ax.set_xlim(0, len(projection_data))
         ax.set_yticks([])
         fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.horizontal_projection_container)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.horizontal_projection_container)
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
 
     def _display_vertical_projection(self, projection_data):
-        fig, ax = plt.subplots(figsize=(2, 4), dpi=80)
+        fig = figure.Figure(figsize=(2, 4), dpi=80)
+        ax = fig.subplots()
         y_values = np.arange(len(projection_data))
         ax.plot(projection_data, y_values, color="blue", linewidth=1)
         ax.set_title("Vertical Projection", fontsize=8)
@@ -839,7 +1261,7 @@ class MainWindow(tk.Frame):
         ax.set_yticks([])
         fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.vertical_projection_container)
+        canvas = backend_tkagg.FigureCanvasTkAgg(fig, master=self.vertical_projection_container)
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
 
@@ -849,7 +1271,6 @@ class MainWindow(tk.Frame):
             messagebox.showinfo("Missing Input", "Input kernel size")
             return
 
-        self.operation_reverse.push(self.modified_image)
         try:
             kernel_size = int(kernel_value)
             if kernel_size % 2 == 0:
@@ -859,11 +1280,41 @@ class MainWindow(tk.Frame):
             messagebox.showinfo("Invalid Input", "Kernel size must be an integer.")
             return
 
-        filtered_img = apply_averaging_filter(self.modified_image, kernel_size)
-        self.modified_image = filtered_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
-        self.update_modified_histogram()
-        self.update_projections()
+        self._apply_operation("averaging", kernel_size=kernel_size)
+
+    def apply_median_filter_event(self, event=None):
+        kernel_value = self.median_kernel_entry.get().strip()
+        if not kernel_value:
+            messagebox.showinfo("Missing Input", "Input kernel size")
+            return
+
+        try:
+            kernel_size = int(kernel_value)
+            if kernel_size < 1 or kernel_size % 2 == 0:
+                messagebox.showinfo("Invalid Input", "Kernel size must be an odd positive integer.")
+                return
+        except ValueError:
+            messagebox.showinfo("Invalid Input", "Kernel size must be an integer.")
+            return
+
+        if not self.modified_image:
+            print("No image loaded.")
+            return
+
+        try:
+            self._apply_operation("median", kernel_size=kernel_size)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Median filter error: {str(e)}")
+
+    def apply_bilateral_filter_event(self, event=None):
+        if not self.modified_image:
+            print("No image loaded.")
+            return
+        try:
+            self._apply_operation("bilateral", sigma_spatial=self.bilateral_sigma_scale.get(),
+                                  sigma_range=self.bilateral_range_scale.get())
+        except Exception as e:
+            messagebox.showerror("Error", f"Bilateral filter error: {str(e)}")
 
     def apply_sharpening_filter_event(self, event=None):
         kernel_value = self.sharpen_kernel_entry.get().strip()
@@ -871,7 +1322,6 @@ class MainWindow(tk.Frame):
             messagebox.showinfo("Input a kernel size")
             return
 
-        self.operation_reverse.push(self.modified_image)
         try:
             kernel_size = int(kernel_value)
             if kernel_size % 2 == 0:
@@ -886,21 +1336,30 @@ class MainWindow(tk.Frame):
             return
 
         try:
-            filtered_image = apply_sharpening_filter(self.modified_image, kernel_size, intensity_value)
-            self.modified_image = filtered_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
+            self._apply_operation("sharpening", kernel_size=kernel_size, intensity=intensity_value)
         except Exception as e:
             messagebox.showerror("Error", f"Some error appeared: {str(e)}")
 
+    def _update_sigma_range(self):
+        # The recursive filter costs the same for any sigma, so it gets a much
+        # longer scale for background estimation.
+        self.gaussian_sigma_scale.configure(to=100 if self.gaussian_recursive.get() else 10)
+
     def apply_gaussian_filter_event(self, event=None):
+        if self.gaussian_recursive.get():
+            if not self.modified_image:
+                print("No image loaded.")
+                return
+            sigma_value = self.gaussian_sigma_scale.get()
+            self._apply_operation("gaussian", kernel_size=None, sigma=sigma_value, method="recursive")
+            print(f"recursive, sigma: {sigma_value}")
+            return
+
         kernel_value = self.gaussian_kernel_entry.get().strip()
         if not kernel_value:
             messagebox.showinfo("Invalid Input", "Kernel size is not odd")
             return
 
-        self.operation_reverse.push(self.modified_image)
         try:
             kernel_size = int(kernel_value)
             if kernel_size % 2 == 0:
@@ -916,87 +1375,105 @@ class MainWindow(tk.Frame):
             return
 
         try:
-            filtered_image = apply_gaussian_filter(self.modified_image, kernel_size, sigma_value)
-            self.modified_image = filtered_image
-            self._display_image_in_panel(self.image_container, self.modified_image)
-            self.update_modified_histogram()
-            self.update_projections()
-
+            self._apply_operation("gaussian", kernel_size=kernel_size, sigma=sigma_value)
             print(f"kernel size: {kernel_size}, sigma: {sigma_value}")
         except Exception as e:
             messagebox.showerror("Error", f"Cannot apply gaussian cause: {str(e)}")
             print(f"Error: {e}")
 
     def apply_binarization(self, event=None):
-        self.operation_reverse.push(self.modified_image)
+        if not self.modified_image:
+            print("No image to binarize.")
+            return
         threshold = self.biner_scale.get()
-        current_img = self.modified_image
-        binarized_img = ImageProcessor.binarize(current_img, int(threshold))
-        self.modified_image = binarized_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
-        self.update_modified_histogram()
-        self.update_projections()
+        if bit_depth.max_value(bit_depth.working_mode(self.modified_image)) > 1:
+            threshold = int(threshold)
+        try:
+            self._apply_operation("binarize", threshold=threshold)
+        except Exception as e:
+            messagebox.showerror("Error", f"Binarization error: {str(e)}")
+
+    def apply_auto_threshold(self):
+        if not self.modified_image:
+            print("No image to binarize.")
+            return
+
+        counts, upper = self.modified_histogram
+        if len(counts) < 256:
+            counts, upper = bit_depth.gray_histogram(self.modified_image, 256)
+        method = self.threshold_method.get()
+        try:
+            threshold = thresholding.threshold_from_histogram(counts, upper, method)
+            self.biner_scale.set(threshold)
+            print(f"{method} threshold: {threshold}")
+            self._apply_operation("binarize", threshold=threshold)
+        except Exception as e:
+            messagebox.showerror("Error", f"Automatic threshold error: {str(e)}")
+
+    def apply_adaptive_threshold(self, event=None):
+        if not self.modified_image:
+            print("No image to binarize.")
+            return
+
+        try:
+            window = int(self.adaptive_window_entry.get().strip())
+        except ValueError:
+            messagebox.showinfo("Invalid Input", "Window size must be an integer.")
+            return
+        if window < 3 or window % 2 == 0:
+            messagebox.showinfo("Invalid Input", "Window size must be odd and at least 3.")
+            return
+
+        self._apply_operation("adaptive_binarize", method=self.adaptive_method.get(), window=window)
+
+    def apply_equalization(self):
+        if not self.modified_image:
+            print("No image loaded.")
+            return
+        self._apply_operation("equalize")
+
+    def apply_clahe(self):
+        if not self.modified_image:
+            print("No image loaded.")
+            return
+        self._apply_operation("clahe", clip_limit=self.clahe_clip_scale.get())
 
     def apply_contrast(self, event=None):
         if not self.modified_image:
             print("No image to adjust contrast.")
             return
 
-        self.operation_reverse.push(self.modified_image)
         contrast_value = self.contrast_scale.get()
         factor = contrast_value / 100.0
 
-        current_img = self.modified_image
-        adjusted_img = ImageProcessor.adjust_contrast(current_img, factor)
-        self.modified_image = adjusted_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
+        self._apply_operation("contrast", factor=factor)
         print(f"Applied contrast adjustment: {contrast_value}% (factor={factor:.2f})")
 
-        self.update_modified_histogram()
-        self.update_projections()
-
     def apply_brightness(self, event=None):
         if not self.modified_image:
             print("Brak obrazu.")
             return
 
-        self.operation_reverse.push(self.modified_image)
         brightness_value = self.brightness_scale.get()
         factor = brightness_value / 100.0
 
-        current_img = self.modified_image
-        adjusted_img = ImageProcessor.adjust_brightness(current_img, factor)
-        self.modified_image = adjusted_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
-        self.update_modified_histogram()
-        self.update_projections()
+        self._apply_operation("brightness", factor=factor)
 
     def apply_shades_of_gray(self):
         if not self.modified_image:
             print("Brak obrazu.")
             return
 
-        self.operation_reverse.push(self.modified_image)
-        gray_img = ImageProcessor.to_grayscale(self.modified_image)
-        self.modified_image = gray_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
-        self.update_modified_histogram()
-        self.update_projections()
+        self._apply_operation("grayscale")
 
     def apply_negative(self):
         if not self.modified_image:
             print("Brak obrazu.")
             return
 
-        self.operation_reverse.push(self.modified_image)
-        negative_img = ImageProcessor.to_negative(self.modified_image)
-        self.modified_image = negative_img
-        self._display_image_in_panel(self.image_container, self.modified_image)
+        self._apply_operation("negative")
         print("Przetworzono obraz do negatywu.")
 
-        self.update_modified_histogram()
-        self.update_projections()
-
     def _display_image_in_panel(self, panel, image):
         panel.update_idletasks()
         panel_width = panel.winfo_width()
@@ -1013,6 +1490,7 @@ class MainWindow(tk.Frame):
                 return
         else:
             img = image
+        img = bit_depth.to_display_image(img)
 
         orig_width, orig_height = img.size
         scale = min(avail_width / orig_width, avail_height / orig_height)
@@ -1034,5 +1512,3 @@ class MainWindow(tk.Frame):
         label = tk.Label(container, image=photo, bg=container.cget("bg"))
         label.image = photo
         label.place(relx=0.5, rely=0.5, anchor="center")
-
-        self.update_projections()
@@ -0,0 +1,178 @@
+import numpy as np
+from PIL import Image
+from bit_depth import working_mode, max_value, to_array, from_array
+from image_processing import ImageProcessor
+from fast_kernels import (correlate, rgb_to_gray, gradient_magnitude, laplace_magnitude, roberts_magnitude,
+                          quantize, recursive_gaussian)
+from graphics_filter import (kernel_of_the_gauss, sharpening_kernel, gaussian_kernel_size, GAUSSIAN_METHODS,
+                             RECURSIVE_MIN_SIGMA)
+from edge_detection import ROBERTS_WEIGHTS, SOBEL_WEIGHTS, SCHARR_WEIGHTS, LAPLACE_WEIGHTS
+
+
+class WorkingBuffer:
+    # Keeps the image as float32 between operations. Every operation writes into
+    # a spare buffer of the right shape and the two are swapped afterwards, so a
+    # long chain allocates nothing once the buffers exist; pixels are quantized
+    # to the image's bit depth only when an Image is requested.
+    def __init__(self, image: Image.Image = None):
+        self._mode = None
+        self._front = None
+        self._spare = {}
+        self._scratch = {}
+        if image is not None:
+            self.load(to_array(image), working_mode(image))
+
+    def load(self, pixels: np.ndarray, mode: str):
+        # A buffer that is kept around (e.g. by a batch worker) reuses its float32
+        # buffers for the next image of the same size.
+        if self._front is not None:
+            if self._front.shape[:2] != pixels.shape[:2]:
+                self._spare.clear()
+                self._scratch.clear()
+            else:
+                self._spare[self._front.shape] = self._front
+        self._front = self._target(pixels.shape)
+        np.copyto(self._front, pixels)
+        self._mode = mode
+        return self
+
+    @property
+    def array(self):
+        return self._front
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def max_value(self):
+        return max_value(self._mode)
+
+    @property
+    def dtype(self):
+        if self._mode == "F":
+            return np.float32
+        return np.uint8 if self.max_value == 255 else np.uint16
+
+    def apply(self, name, **params):
+        method = getattr(self, name, None)
+        if name not in OPERATION_NAMES or method is None:
+            raise ValueError(f"Operation not supported in high precision mode: {name}")
+        method(**params)
+        return self
+
+    def to_array(self, out: np.ndarray = None) -> np.ndarray:
+        if self._mode == "F":
+            if out is None:
+                return self._front.copy()
+            np.copyto(out, self._front)
+            return out
+        return quantize(self._front, self.max_value, self.dtype, out=out, scratch=self._scratch)
+
+    def to_image(self) -> Image.Image:
+        if self._mode == "F":
+            return from_array(self._front, self._mode)
+        return Image.fromarray(self.to_array())
+
+    def grayscale(self):
+        if self._front.ndim == 2:
+            return
+        self._swap(rgb_to_gray(self._front, out=self._target(self._front.shape[:2])))
+        self._mode = "L"
+
+    def negative(self):
+        np.subtract(self.max_value, self._front, out=self._front)
+
+    def brightness(self, factor):
+        np.multiply(self._front, factor, out=self._front)
+        np.clip(self._front, 0, self.max_value, out=self._front)
+
+    def contrast(self, factor):
+        middle = ImageProcessor.middle_value(self._mode)
+        np.subtract(self._front, middle, out=self._front)
+        np.multiply(self._front, factor, out=self._front)
+        np.add(self._front, middle, out=self._front)
+        np.clip(self._front, 0, self.max_value, out=self._front)
+
+    def binarize(self, threshold):
+        gray = rgb_to_gray(self._front, out=self._target(self._front.shape[:2]))
+        np.multiply(gray > threshold, np.float32(255), out=gray)
+        self._swap(gray)
+        self._mode = "L"
+
+    def gaussian(self, kernel_size, sigma, method="dense"):
+        if method not in GAUSSIAN_METHODS:
+            raise ValueError(f"Unknown Gaussian method '{method}', expected one of: {', '.join(GAUSSIAN_METHODS)}")
+        if method == "recursive":
+            if sigma >= RECURSIVE_MIN_SIGMA:
+                recursive_gaussian(self._front, sigma, out=self._front)
+                return
+            kernel_size = None
+        if kernel_size is None:
+            kernel_size = gaussian_kernel_size(sigma)
+        self._convolve(kernel_of_the_gauss(kernel_size, sigma))
+
+    def sharpening(self, kernel_size, intensity):
+        self._convolve(sharpening_kernel(kernel_size, intensity))
+        np.clip(self._front, 0, self.max_value, out=self._front)
+
+    def averaging(self, kernel_size):
+        val = 1.0 / (kernel_size * kernel_size)
+        self._convolve([[val for _ in range(kernel_size)] for _ in range(kernel_size)])
+
+    def roberts(self, weight_matrix=None):
+        weight_matrix = _check_weights(weight_matrix, ROBERTS_WEIGHTS, 2)
+        self._edge(roberts_magnitude, weight_matrix)
+
+    def sobel(self, weight_matrix=None):
+        weight_matrix = _check_weights(weight_matrix, SOBEL_WEIGHTS, 3)
+        self._edge(gradient_magnitude, weight_matrix, _rotated(weight_matrix))
+
+    def scharr(self, weight_matrix=None):
+        weight_matrix = _check_weights(weight_matrix, SCHARR_WEIGHTS, 3)
+        self._edge(gradient_magnitude, weight_matrix, _rotated(weight_matrix))
+
+    def laplace(self, weight_matrix=None):
+        weight_matrix = _check_weights(weight_matrix, LAPLACE_WEIGHTS, 3)
+        self._edge(laplace_magnitude, weight_matrix)
+
+    def _convolve(self, kernel):
+        self._swap(correlate(self._front, kernel, out=self._target(self._front.shape), scratch=self._scratch))
+
+    def _edge(self, magnitude, *matrices):
+        if self._front.ndim == 2:
+            gray = self._front
+        else:
+            gray = rgb_to_gray(self._front, out=self._target(self._front.shape[:2]))
+        result = magnitude(gray, *matrices, out=self._target(gray.shape), scratch=self._scratch)
+        if gray is not self._front:
+            self._spare[gray.shape] = gray
+            self._mode = "L"
+        np.clip(result, 0, self.max_value, out=result)
+        self._swap(result)
+
+    def _target(self, shape):
+        buffer = self._spare.pop(shape, None)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=np.float32)
+        return buffer
+
+    def _swap(self, result):
+        self._spare[self._front.shape] = self._front
+        self._front = result
+
+
+OPERATION_NAMES = ("grayscale", "negative", "brightness", "contrast", "binarize", "gaussian", "sharpening",
+                   "averaging", "roberts", "sobel", "scharr", "laplace")
+
+
+def _check_weights(weight_matrix, default, size):
+    if weight_matrix is None:
+        return default
+    if len(weight_matrix) != size or any(len(row) != size for row in weight_matrix):
+        raise ValueError(f"Weight matrix must be {size}x{size}")
+    return weight_matrix
+
+
+def _rotated(weight_matrix):
+    return [list(row) for row in zip(*weight_matrix[::-1])]